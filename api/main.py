@@ -3,16 +3,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-import sys
-import os
 import traceback
-import json
-
-# Add the backend directory to the Python path
-backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
-sys.path.insert(0, backend_path)
+import asyncio
+import threading
+import logging
+import orjson
 
+# The backend is installed as a package (pip install -e backend)
 from src.agent_manager import MultiAgentSystem, AgentManager
+import src.config as config
+
+# Without a handler the agent's token usage logs are dropped
+logging.basicConfig(level=config.LOG_LEVEL)
 
 app = FastAPI()
 
@@ -28,6 +30,16 @@ app.add_middleware(
 # Initialize the agent manager
 agent_manager = MultiAgentSystem()
 
+# All requests share one agent and its memory, so only one turn may run at a time
+_turn_lock = threading.Lock()
+
+# Sentinel marking the end of a streamed response
+_STREAM_END = object()
+
+# Server-sent event framing around each JSON payload
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
 class ChatMessage(BaseModel):
     message: str
     conversation_id: Optional[str] = None
@@ -36,11 +48,26 @@ class ChatMessage(BaseModel):
 async def chat(message: ChatMessage):
     try:
         async def generate():
-            for chunk in agent_manager.stream_chat(message.message):
-                if isinstance(chunk, dict):
-                    yield f"data: {json.dumps(chunk)}\n\n"
-                else:
-                    yield f"data: {json.dumps({'type': 'content', 'content': chunk})}\n\n"
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue()
+            
+            # The OpenAI stream is blocking, so drain it in a worker thread
+            # instead of stalling the event loop for every network read
+            def pump():
+                try:
+                    with _turn_lock:
+                        for chunk in agent_manager.stream_chat(message.message):
+                            loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                finally:
+                    loop.call_soon_threadsafe(queue.put_nowait, _STREAM_END)
+            
+            producer = loop.run_in_executor(None, pump)
+            
+            while (chunk := await queue.get()) is not _STREAM_END:
+                yield _SSE_PREFIX + orjson.dumps(chunk) + _SSE_SUFFIX
+            
+            # Surface any exception raised while streaming
+            await producer
         
         return StreamingResponse(
             generate(),
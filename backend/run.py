@@ -5,10 +5,17 @@ Wrapper script to check for necessary files and run the personal assistant.
 import os
 import sys
 import argparse
+import types
+import importlib.util
 from colorama import Fore, Style, init
 
-# Initialize colorama
-init()
+# Same gate as src/main.py: no colors, nor colorama's stdout wrapper, unless writing to a terminal
+if os.environ.get("NO_COLOR") or not sys.stdout.isatty():
+    Fore = types.SimpleNamespace(GREEN="", YELLOW="", RED="")
+    Style = types.SimpleNamespace(RESET_ALL="")
+else:
+    # Initialize colorama
+    init()
 
 def check_prerequisites():
     """Check if all prerequisites are met to run the assistant."""
@@ -22,18 +29,16 @@ def check_prerequisites():
         print(f"{Fore.RED}Error: 'src/main.py' not found.{Style.RESET_ALL}")
         return False
         
-    # Check for Python packages
-    try:
-        import openai
-        import dotenv
-        import pytz
-        import bs4
-        import pydantic
-        from google.oauth2.credentials import Credentials
-    except ImportError as e:
-        print(f"{Fore.RED}Error: Missing required package: {e}{Style.RESET_ALL}")
-        print(f"{Fore.YELLOW}Please run: pip install -r requirements.txt{Style.RESET_ALL}")
-        return False
+    # Check for Python packages without importing them, the assistant does that itself
+    for package in ["openai", "dotenv", "pytz", "bs4", "pydantic", "google.oauth2"]:
+        try:
+            found = importlib.util.find_spec(package) is not None
+        except ModuleNotFoundError:
+            found = False
+        if not found:
+            print(f"{Fore.RED}Error: Missing required package: {package}{Style.RESET_ALL}")
+            print(f"{Fore.YELLOW}Please run: pip install -r requirements.txt{Style.RESET_ALL}")
+            return False
     
     # Ensure keys directory exists
     os.makedirs("keys", exist_ok=True)
@@ -92,16 +97,17 @@ def main():
         print(f"{Fore.GREEN}All checks passed. You can run the assistant.{Style.RESET_ALL}")
         sys.exit(0)
     
-    # Build command
-    cmd = [sys.executable, "src/main.py"]
+    # Build the arguments for the main program
+    sys.argv = ["src/main.py"]
     if args.multi:
-        cmd.append("--multi")
+        sys.argv.append("--multi")
     if args.debug:
-        cmd.append("--debug")
+        sys.argv.append("--debug")
     
-    # Run the main program
+    # Run the main program in this interpreter instead of starting a new one
     print(f"{Fore.GREEN}Starting personal assistant...{Style.RESET_ALL}")
-    os.execv(sys.executable, cmd)
+    from src.main import main as run_assistant
+    run_assistant()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,11 +1,8 @@
 """
 Personal Assistant package initialization.
-"""
-
-# Import main components
-from src.agent_manager import AgentManager, MultiAgentSystem
-from src.memory import ConversationMemory
-from src.tools import initialize_tools
 
-# Initialize tools
-initialize_tools() 
\ No newline at end of file
+Components are imported from their modules (e.g. `from src.agent_manager
+import MultiAgentSystem`) so that importing `src.config` or `src.memory`
+does not pull in the OpenAI client and the Google API libraries. Tools are
+registered when `src.tools` is first imported.
+"""
\ No newline at end of file
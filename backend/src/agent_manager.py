@@ -1,21 +1,39 @@
 """
 Agent manager for orchestrating multiple agents with different capabilities.
 """
-from typing import List, Dict, Any, Optional, Union, Generator
-import json
+from typing import List, Dict, Any, Optional, Union, Generator, Tuple
+import orjson
 import os
-from openai import OpenAI
+import hashlib
+import httpx
+from openai import OpenAI, DefaultHttpxClient
 from openai.types.chat import ChatCompletionChunk
 import time
-from colorama import Fore, Style, init
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pydantic import BaseModel, Field
 
 from src.memory import ConversationMemory
-from src.tools.base import ToolRegistry
+from src.response_cache import ResponseCache
+from src.tools.base import BatchableTool, ToolRegistry
 import src.config as config
 
-# Initialize colorama
-init()
+logger = logging.getLogger(__name__)
+
+# Maximum number of tool calls executed in parallel
+MAX_TOOL_WORKERS = 8
+
+_http_client: Optional[httpx.Client] = None
+
+def get_http_client() -> httpx.Client:
+    """Get the keep-alive HTTP/2 connection pool shared by all OpenAI clients."""
+    global _http_client
+    if _http_client is None:
+        _http_client = DefaultHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60)
+        )
+    return _http_client
 
 class ToolCallResult(BaseModel):
     """Model for tool call results."""
@@ -28,29 +46,48 @@ class AgentManager:
     Manages multiple agents with different capabilities and handles their interactions.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, provider: str = config.DEFAULT_PROVIDER):
         """
         Initialize the agent manager.
         
         Args:
             api_key: OpenAI API key (defaults to the one in config).
+            provider: Model family behind the OpenAI-compatible endpoint
+                ("openai" or "anthropic"), used to pick the caching style.
         """
         self.api_key = api_key or config.OPENAI_API_KEY
+        self.provider = provider
+        self._cache_style = "anthropic" if provider == "anthropic" else "none"
+        
+        # Prompt cache token counters for cost reporting
+        self.cache_usage = {"cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
         
         if not self.api_key:
             raise ValueError("OpenAI API Key is required")
         
         # Initialize the OpenAI client
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(api_key=self.api_key, http_client=get_http_client())
+        
+        # Tools are registered at import time, so build their schema once
+        self._tools_schema = ToolRegistry.get_openai_tools_schema()
+        self._tools_version = ToolRegistry.version
+        
+        # Stable key so every turn is routed to the same prompt cache shard
+        self._cache_key = self._prompt_cache_key()
         
         # Initialize conversation memory
         self.memory = ConversationMemory(
-            memory_file="data/conversation_history.json"
+            memory_file="data/conversation_history.jsonl",
+            load_limit=config.MEMORY_RETURN_MESSAGES
         )
         
+        # Cache for repeated questions answered without tools
+        self.response_cache = ResponseCache()
+        
         # Add system message to memory if it's empty
         if not self.memory.get_messages():
             self.memory.add_message("system", config.SYSTEM_INSTRUCTIONS)
+            self.memory.flush()
     
     def chat(self, user_input: str) -> str:
         """
@@ -62,23 +99,38 @@ class AgentManager:
         Returns:
             The agent's response as a string.
         """
+        context_hash = self._context_hash()
+        cached_response = self.response_cache.get(user_input, context_hash)
+        
         # Add user message to memory
         self.memory.add_message("user", user_input)
         
+        if cached_response is not None:
+            self.memory.add_message("assistant", cached_response)
+            self.response_cache.put(user_input, cached_response, self._context_hash())
+            return cached_response
+        
         # Get messages from memory
-        messages = self.memory.as_openai_messages()
+        messages = self.memory.as_openai_messages(
+            limit=config.MEMORY_RETURN_MESSAGES,
+            cache_style=self._cache_style
+        )
         
         # Get available tools
-        tools = ToolRegistry.get_openai_tools_schema()
+        tools = self._get_tools_schema()
         
         # Call the OpenAI API
         response = self.client.chat.completions.create(
             model=config.DEFAULT_MODEL,
             messages=messages,
             tools=tools,
-            tool_choice="auto"
+            tool_choice="auto",
+            user=self._cache_key,
+            extra_body={"prompt_cache_key": self._cache_key}
         )
         
+        self._record_usage(response.usage)
+        
         # Get the response message
         response_message = response.choices[0].message
         
@@ -99,12 +151,26 @@ class AgentManager:
             }
             self.memory.add_message("assistant", response_message.content or "", tool_calls_metadata)
             
-            # Execute each tool call
-            tool_results = []
-            for tool_call in response_message.tool_calls:
-                result = self._execute_tool_call(tool_call)
-                tool_results.append(result)
-                
+            # Execute the tool calls concurrently, batching those that can share a request
+            calls = [(tc.function.name, tc.function.arguments) for tc in response_message.tool_calls]
+            plan = self._plan_tool_calls(calls)
+            results = {}
+            with ThreadPoolExecutor(max_workers=min(len(plan), MAX_TOOL_WORKERS)) as executor:
+                futures = [(group, executor.submit(self._run_tool_group, calls, group)) for group in plan]
+                for group, future in futures:
+                    try:
+                        results.update(zip(group, future.result()))
+                    except Exception as e:
+                        for index in group:
+                            results[index] = f"Error executing tool {calls[index][0]}: {str(e)}"
+            
+            # Keep the original tool call order
+            tool_results = [
+                ToolCallResult(tool_name=tc.function.name, tool_call_id=tc.id, result=results[index])
+                for index, tc in enumerate(response_message.tool_calls)
+            ]
+            
+            for result in tool_results:
                 # Add tool result to memory
                 self.memory.add_message(
                     "tool",
@@ -116,14 +182,24 @@ class AgentManager:
                 )
             
             # Get messages from memory again with tool results
-            messages = self.memory.as_openai_messages()
+            messages = self.memory.as_openai_messages(
+                limit=config.MEMORY_RETURN_MESSAGES,
+                cache_style=self._cache_style
+            )
             
-            # Call the OpenAI API again with tool results
+            # Call the OpenAI API again with tool results, keeping the same tools
+            # so the cached prefix matches but no further tool calls are made
             second_response = self.client.chat.completions.create(
                 model=config.DEFAULT_MODEL,
-                messages=messages
+                messages=messages,
+                tools=tools,
+                tool_choice="none",
+                user=self._cache_key,
+                extra_body={"prompt_cache_key": self._cache_key}
             )
             
+            self._record_usage(second_response.usage)
+            
             # Get the final response
             final_response = second_response.choices[0].message.content
             
@@ -134,6 +210,9 @@ class AgentManager:
         else:
             # No tool calls, just return the response
             self.memory.add_message("assistant", response_message.content)
+            self.response_cache.put(
+                user_input, response_message.content, context_hash, self._context_hash()
+            )
             return response_message.content
     
     def stream_chat(self, user_input: str) -> Generator[Dict[str, Any], None, None]:
@@ -146,14 +225,42 @@ class AgentManager:
         Yields:
             Dictionaries containing the response chunk data.
         """
+        try:
+            yield from self._stream_turn(user_input)
+        finally:
+            # Persist partial turns too, e.g. when the client disconnects
+            self.memory.flush()
+    
+    def _stream_turn(self, user_input: str) -> Generator[Dict[str, Any], None, None]:
+        """
+        Run a single streamed turn, see stream_chat.
+        
+        Args:
+            user_input: The user's input message.
+            
+        Yields:
+            Dictionaries containing the response chunk data.
+        """
+        context_hash = self._context_hash()
+        cached_response = self.response_cache.get(user_input, context_hash)
+        
         # Add user message to memory
         self.memory.add_message("user", user_input)
         
+        if cached_response is not None:
+            yield {"type": "content", "content": cached_response}
+            self.memory.add_message("assistant", cached_response)
+            self.response_cache.put(user_input, cached_response, self._context_hash())
+            return
+        
         # Get messages from memory
-        messages = self.memory.as_openai_messages()
+        messages = self.memory.as_openai_messages(
+            limit=config.MEMORY_RETURN_MESSAGES,
+            cache_style=self._cache_style
+        )
         
         # Get available tools
-        tools = ToolRegistry.get_openai_tools_schema()
+        tools = self._get_tools_schema()
         
         # Call the OpenAI API with streaming
         stream = self.client.chat.completions.create(
@@ -161,7 +268,10 @@ class AgentManager:
             messages=messages,
             tools=tools,
             tool_choice="auto",
-            stream=True
+            stream=True,
+            stream_options={"include_usage": True},
+            user=self._cache_key,
+            extra_body={"prompt_cache_key": self._cache_key}
         )
         
         # Variables to track streaming state
@@ -174,6 +284,12 @@ class AgentManager:
         for chunk in stream:
             collected_chunks.append(chunk)
             
+            # The final chunk only carries token usage and has no choices
+            if chunk.usage:
+                yield {"type": "usage", **self._record_usage(chunk.usage)}
+            if not chunk.choices:
+                continue
+            
             # Check for content in the chunk
             if chunk.choices[0].delta.content:
                 content = chunk.choices[0].delta.content
@@ -224,60 +340,75 @@ class AgentManager:
             
             self.memory.add_message("assistant", assistant_content or "", tool_calls_metadata)
             
-            # Execute each tool call and yield results
-            for index, tool_call in collected_tool_calls.items():
-                try:
-                    function_name = tool_call["function"]["name"]
-                    function_args = json.loads(tool_call["function"]["arguments"])
-                    
-                    # Yield that we're executing a tool
-                    yield {"type": "tool_start", "name": function_name}
-                    
-                    # Execute the tool
-                    result = ToolRegistry.execute_tool(function_name, function_args)
-                    
-                    # Add tool result to memory
-                    self.memory.add_message(
-                        "tool",
-                        result,
-                        {
-                            "tool_call_id": tool_call["id"],
-                            "name": function_name
-                        }
-                    )
-                    
-                    # Yield the tool result
-                    yield {"type": "tool_result", "name": function_name, "result": result}
-                except Exception as e:
-                    error_message = f"Error executing tool {function_name}: {str(e)}"
-                    yield {"type": "tool_error", "name": function_name, "error": error_message}
-                    
-                    # Add error to memory
-                    self.memory.add_message(
-                        "tool",
-                        error_message,
-                        {
-                            "tool_call_id": tool_call["id"],
-                            "name": function_name
-                        }
-                    )
+            # Announce every tool before running them
+            for tool_call in collected_tool_calls.values():
+                yield {"type": "tool_start", "name": tool_call["function"]["name"]}
+            
+            # Tool calls are independent and I/O-bound, so run them concurrently,
+            # batching those that can share a request, and yield each result as
+            # soon as it is available
+            tool_calls = list(collected_tool_calls.values())
+            calls = [(tc["function"]["name"], tc["function"]["arguments"]) for tc in tool_calls]
+            results = {}
+            with ThreadPoolExecutor(max_workers=min(len(calls), MAX_TOOL_WORKERS)) as executor:
+                futures = {
+                    executor.submit(self._run_tool_group, calls, group): group
+                    for group in self._plan_tool_calls(calls)
+                }
+                for future in as_completed(futures):
+                    group = futures[future]
+                    try:
+                        group_results = future.result()
+                    except Exception as e:
+                        for index in group:
+                            results[index] = f"Error executing tool {calls[index][0]}: {str(e)}"
+                            yield {"type": "tool_error", "name": calls[index][0], "error": results[index]}
+                        continue
+                    for index, result in zip(group, group_results):
+                        results[index] = result
+                        yield {"type": "tool_result", "name": calls[index][0], "result": result}
+            
+            # Add tool results to memory in the original tool call order
+            for index, tool_call in enumerate(tool_calls):
+                self.memory.add_message(
+                    "tool",
+                    results[index],
+                    {
+                        "tool_call_id": tool_call["id"],
+                        "name": tool_call["function"]["name"]
+                    }
+                )
             
             # Get messages from memory again with tool results
-            messages = self.memory.as_openai_messages()
+            messages = self.memory.as_openai_messages(
+                limit=config.MEMORY_RETURN_MESSAGES,
+                cache_style=self._cache_style
+            )
             
             # Call the OpenAI API again with tool results
             yield {"type": "second_response_start"}
             
+            # Keep the same tools so the cached prefix matches, but disallow calls
             second_stream = self.client.chat.completions.create(
                 model=config.DEFAULT_MODEL,
                 messages=messages,
-                stream=True
+                tools=tools,
+                tool_choice="none",
+                stream=True,
+                stream_options={"include_usage": True},
+                user=self._cache_key,
+                extra_body={"prompt_cache_key": self._cache_key}
             )
             
             # Collect the final response
             final_response_chunks = []
             
             for chunk in second_stream:
+                if chunk.usage:
+                    yield {"type": "usage", **self._record_usage(chunk.usage)}
+                if not chunk.choices:
+                    continue
+                
                 if chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
                     final_response_chunks.append(content)
@@ -290,42 +421,119 @@ class AgentManager:
             # No tool calls, just add the response to memory
             assistant_content = "".join(collected_messages)
             self.memory.add_message("assistant", assistant_content)
+            self.response_cache.put(
+                user_input, assistant_content, context_hash, self._context_hash()
+            )
+    
+    def _context_hash(self) -> str:
+        """Hash the recent messages a cached response depends on."""
+        return ResponseCache.context_hash(
+            self.memory.get_messages(config.RESPONSE_CACHE_CONTEXT_MESSAGES)
+        )
     
-    def _execute_tool_call(self, tool_call: Any) -> ToolCallResult:
+    def _get_tools_schema(self) -> List[Dict[str, Any]]:
         """
-        Execute a tool call and return the result.
+        Get the OpenAI tools schema, rebuilding it only if new tools were registered.
+        
+        Returns:
+            The OpenAI tools schema for all registered tools.
+        """
+        if ToolRegistry.version != self._tools_version:
+            self._tools_schema = ToolRegistry.get_openai_tools_schema()
+            self._tools_version = ToolRegistry.version
+            self._cache_key = self._prompt_cache_key()
+        return self._tools_schema
+    
+    def _prompt_cache_key(self) -> str:
+        """
+        Build the prompt cache key from the cached prefix of every request.
+        
+        Returns:
+            A key that changes whenever the system instructions or the tools change.
+        """
+        digest = hashlib.sha256(config.SYSTEM_INSTRUCTIONS.encode())
+        digest.update(ToolRegistry.get_openai_tools_schema_bytes())
+        return digest.hexdigest()[:32]
+    
+    def _record_usage(self, usage: Any) -> Dict[str, Any]:
+        """
+        Log the token usage of a response and accumulate prompt cache counters.
         
         Args:
-            tool_call: The tool call object from OpenAI.
+            usage: The usage object of a chat completion response.
             
         Returns:
-            A ToolCallResult object with the result of the tool call.
+            A dictionary with the prompt, cached and completion token counts.
         """
-        try:
-            function_name = tool_call.function.name
-            function_args = json.loads(tool_call.function.arguments)
-            
-            result = ToolRegistry.execute_tool(function_name, function_args)
+        if usage is None:
+            return {}
+        
+        details = getattr(usage, "prompt_tokens_details", None)
+        record = {
+            "prompt_tokens": usage.prompt_tokens,
+            "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+            "completion_tokens": usage.completion_tokens
+        }
+        
+        # Anthropic-style counters reported by compatible gateways
+        for key in self.cache_usage:
+            self.cache_usage[key] += getattr(usage, key, None) or 0
+        
+        logger.info(orjson.dumps({"event": "usage", "model": config.DEFAULT_MODEL, **record}).decode())
+        return record
+    
+    def _plan_tool_calls(self, calls: List[Tuple[str, str]]) -> List[List[int]]:
+        """
+        Group the tool calls of one response into units of work.
+        
+        Calls to batchable tools with the same batch_key form one group, sent
+        as a single batched request. Every other call is a group of its own.
+        
+        Args:
+            calls: The name and JSON arguments of each tool call.
             
-            return ToolCallResult(
-                tool_name=function_name,
-                tool_call_id=tool_call.id,
-                result=result
-            )
-        except Exception as e:
-            error_message = f"Error executing tool {tool_call.function.name}: {str(e)}"
+        Returns:
+            The indices of the calls in each group, in order of first appearance.
+        """
+        plan = []
+        batches: Dict[str, List[int]] = {}
+        for index, (name, _) in enumerate(calls):
+            tool_class = ToolRegistry.get_tool(name)
+            if tool_class is None or not issubclass(tool_class, BatchableTool):
+                plan.append([index])
+                continue
+            if tool_class.batch_key not in batches:
+                batches[tool_class.batch_key] = []
+                plan.append(batches[tool_class.batch_key])
+            batches[tool_class.batch_key].append(index)
+        return plan
+    
+    def _run_tool_group(self, calls: List[Tuple[str, str]], group: List[int]) -> List[Any]:
+        """
+        Execute a group of tool calls planned by _plan_tool_calls.
+        
+        Args:
+            calls: The name and JSON arguments of each tool call.
+            group: The indices of the calls to execute.
             
-            return ToolCallResult(
-                tool_name=tool_call.function.name,
-                tool_call_id=tool_call.id,
-                result=error_message
-            )
+        Returns:
+            The results of the calls in the group, in order.
+        """
+        if len(group) == 1:
+            name, arguments = calls[group[0]]
+            return [ToolRegistry.execute_tool(name, orjson.loads(arguments))]
+        return ToolRegistry.execute_batch([
+            (calls[index][0], orjson.loads(calls[index][1])) for index in group
+        ])
     
     def clear_memory(self) -> None:
         """Clear the conversation memory."""
         self.memory.clear()
         # Add system message back
         self.memory.add_message("system", config.SYSTEM_INSTRUCTIONS)
+        self.memory.flush()
+        # The fresh context hashes like the first turns did, so old answers would match again
+        self.response_cache.clear()
 
 class MultiAgentSystem:
     """
@@ -345,14 +553,14 @@ class MultiAgentSystem:
             raise ValueError("OpenAI API Key is required")
         
         # Initialize the OpenAI client
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(api_key=self.api_key, http_client=get_http_client())
         
         # Initialize the main agent
         self.primary_agent = AgentManager(api_key)
         
         # Initialize memory for system coordination
         self.system_memory = ConversationMemory(
-            memory_file="data/system_memory.json"
+            memory_file="data/system_memory.jsonl"
         )
         
         # Define agent roles
@@ -378,7 +586,7 @@ class MultiAgentSystem:
         # which specialized agent should handle the request
         return self.primary_agent.chat(user_input)
     
-    def stream_chat(self, user_input: str) -> Generator[str, None, None]:
+    def stream_chat(self, user_input: str) -> Generator[Dict[str, Any], None, None]:
         """
         Stream the response from the appropriate agent.
         
@@ -386,22 +594,10 @@ class MultiAgentSystem:
             user_input: The user's input message.
             
         Yields:
-            Chunks of the response as they become available.
+            Dictionaries containing the response chunk data.
         """
         # For now, we'll just forward to the primary agent's stream_chat
-        for chunk in self.primary_agent.stream_chat(user_input):
-            # Convert the chunk dictionary to a formatted string based on chunk type
-            if chunk["type"] == "content":
-                yield chunk["content"]
-            elif chunk["type"] == "tool_start":
-                yield f"\n[{Fore.YELLOW}TOOL{Style.RESET_ALL}] Running {chunk['name']}...\n"
-            elif chunk["type"] == "tool_result":
-                result = chunk["result"].replace("\n", "\n  ")  # Indent result
-                yield f"  {result}\n"
-            elif chunk["type"] == "tool_error":
-                yield f"\n[{Fore.RED}ERROR{Style.RESET_ALL}] {chunk['error']}\n"
-            elif chunk["type"] == "second_response_start":
-                yield f"\n[{Fore.GREEN}ASSISTANT{Style.RESET_ALL}] "
+        yield from self.primary_agent.stream_chat(user_input)
     
     def _route_request(self, user_input: str) -> str:
         """
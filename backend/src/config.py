@@ -12,6 +12,7 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # LLM Settings
+DEFAULT_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
 DEFAULT_MODEL = "gpt-4o-mini"
 ADVANCED_MODEL = "gpt-4o"
 
@@ -23,12 +24,19 @@ When managing time, always use the user's timezone (Europe/Rome by default).
 If you need to use multiple tools to complete a task, do so in logical sequence.
 When displaying emails, preserve the exact formatting from the email tools, including the [EMAIL] markers and emojis.
 Do not add any additional formatting or headers to the email output.
+Email listings only contain a preview of each email; use get_email_body with the email's ID to read its full content.
 """
 
 # Memory Settings
 MEMORY_KEY = "chat_history"
 MEMORY_RETURN_MESSAGES = 10
 
+# Response Cache Settings
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL = 24 * 60 * 60  # Seconds, for general questions
+RESPONSE_CACHE_VOLATILE_TTL = 60  # Seconds, for time-dependent questions
+RESPONSE_CACHE_CONTEXT_MESSAGES = 4  # Recent messages a cached response depends on
+
 # Tool Settings
 TIMEZONE = "Europe/Rome"
 DATE_FORMAT = "%Y-%m-%dT%H:%M"
@@ -40,6 +48,9 @@ MAX_CALENDAR_RESULTS = 20
 # Email Settings
 MAX_EMAIL_RESULTS = 20
 
+# Google OAuth Settings
+GOOGLE_OAUTH_PORT = int(os.getenv("GOOGLE_OAUTH_PORT", "0"))  # 0 picks a free port
+
 # Logging Settings
 DEBUG_MODE = os.getenv("DEBUG_MODE", "False").lower() == "true"
 LOG_LEVEL = "DEBUG" if DEBUG_MODE else "INFO"
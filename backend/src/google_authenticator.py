@@ -3,28 +3,49 @@ Google API authentication handler.
 """
 import os
 import sys
+import functools
+import threading
+from typing import Any, List, Union
+import orjson
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.http import HttpRequest, BatchHttpRequest
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 
+import src.config as config
+
+# Seconds before a Google API request is abandoned
+_HTTP_TIMEOUT = 15
+
+def _can_open_browser() -> bool:
+    """Check whether the OAuth flow can open a browser, i.e. the session has a display."""
+    return bool(
+        sys.platform in ('win32', 'darwin')
+        or os.environ.get('DISPLAY')
+        or os.environ.get('WAYLAND_DISPLAY')
+    )
+
 class GoogleAuthenticator:
     """Handles authentication with Google APIs."""
     
-    _instance = None
+    # Shared by all instances, so two authenticators can never run the OAuth flow at once
+    _lock = threading.Lock()
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(GoogleAuthenticator, cls).__new__(cls)
-            cls._instance._initialize()
-        return cls._instance
-    
-    def _initialize(self):
+    def __init__(self):
         """Initialize the authenticator with the required scopes."""
         self.scopes = [
             'https://www.googleapis.com/auth/calendar',
             'https://www.googleapis.com/auth/gmail.modify'
         ]
-        self.creds = None
+        self._creds = None
+        self._authenticated = False
+        # Modification time of the token file when it was last read or written
+        self._token_mtime = None
+        # Idle authorized transports, reused across requests to keep connections alive
+        self._http_pool: List[AuthorizedHttp] = []
+        self._http_pool_lock = threading.Lock()
         
         # Get the project root directory (two levels up from this file)
         project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -32,43 +53,131 @@ class GoogleAuthenticator:
         # Set up paths relative to project root
         self.token_path = os.path.join(project_root, 'backend', 'keys', 'token.json')
         self.credentials_path = os.path.join(project_root, 'backend', 'keys', 'credentials.json')
+    
+    @property
+    def creds(self):
+        """Get the credentials, authenticating on first access."""
+        if not self._authenticated:
+            with self._lock:
+                if not self._authenticated:
+                    self.authenticate()
+                    self._authenticated = True
+        return self._creds
+    
+    def execute(self, request: Union[HttpRequest, BatchHttpRequest]) -> Any:
+        """
+        Execute a Google API request or batch on a pooled HTTP transport.
         
-        # Create keys directory if it doesn't exist
-        os.makedirs(os.path.dirname(self.credentials_path), exist_ok=True)
+        httplib2 is not thread-safe, so every concurrent call borrows its own
+        transport. Transports go back to the pool afterwards, keeping their
+        connections alive for the next calls instead of handshaking again.
         
-        self.authenticate()
+        Args:
+            request: The API request or batch to execute.
+            
+        Returns:
+            The API response (None for batches, whose responses go to their callbacks).
+        """
+        with self._http_pool_lock:
+            http = self._http_pool.pop() if self._http_pool else None
+        
+        if http is None:
+            http = AuthorizedHttp(self.creds, http=httplib2.Http(timeout=_HTTP_TIMEOUT))
+        
+        try:
+            return request.execute(http=http)
+        finally:
+            with self._http_pool_lock:
+                self._http_pool.append(http)
+    
+    def ensure_valid(self):
+        """
+        Make sure the credentials are still valid, refreshing them only when they expire.
+        
+        Valid credentials return without any I/O. Expired ones are first updated
+        from the token file if another process has refreshed it since it was
+        read, and are otherwise refreshed and saved.
+        """
+        creds = self.creds
+        if creds is None or creds.valid:
+            return
+        
+        with self._lock:
+            if creds.valid:
+                return
+            
+            try:
+                if self._token_changed():
+                    # Update the existing object in place, the services hold a reference to it
+                    stored = self._load_token()
+                    creds.token = stored.token
+                    creds.expiry = stored.expiry
+                    self._token_mtime = os.stat(self.token_path).st_mtime
+                
+                if not creds.valid and creds.refresh_token:
+                    creds.refresh(Request())
+                    self._save_token()
+            except Exception as e:
+                print(f"Error refreshing token: {e}")
+    
+    def _token_changed(self) -> bool:
+        """Check whether the token file was modified since it was last read or written."""
+        try:
+            return os.stat(self.token_path).st_mtime != self._token_mtime
+        except OSError:
+            return False
+    
+    def _load_token(self) -> Credentials:
+        """Read the credentials from the token file."""
+        with open(self.token_path, 'rb') as token:
+            info = orjson.loads(token.read())
+        return Credentials.from_authorized_user_info(info, scopes=self.scopes)
+    
+    def _save_token(self):
+        """Write the credentials to the token file atomically, so readers never see a partial file."""
+        os.makedirs(os.path.dirname(self.token_path), exist_ok=True)
+        tmp_path = f"{self.token_path}.tmp"
+        with open(tmp_path, 'w') as token:
+            token.write(self._creds.to_json())
+        os.replace(tmp_path, self.token_path)
+        self._token_mtime = os.stat(self.token_path).st_mtime
     
     def authenticate(self):
         """Authenticate with Google APIs."""
         try:
-            # Ensure the keys directory exists
-            os.makedirs('keys', exist_ok=True)
+            # Check if token file exists, a single stat also gives its modification time
+            try:
+                token_mtime = os.stat(self.token_path).st_mtime
+            except FileNotFoundError:
+                token_mtime = None
             
-            # Check if token file exists
-            if os.path.exists(self.token_path):
+            if token_mtime is not None:
                 try:
                     # Load credentials from the token file
-                    self.creds = Credentials.from_authorized_user_info(
-                        info=eval(open(self.token_path, "r").read()), 
-                        scopes=self.scopes
-                    )
+                    self._creds = self._load_token()
+                    self._token_mtime = token_mtime
                 except Exception as e:
                     print(f"Error loading token: {e}")
-                    self.creds = None
+                    self._creds = None
             
             # If credentials don't exist or are invalid, go through authentication flow
-            if not self.creds or not self.creds.valid:
-                if self.creds and self.creds.expired and self.creds.refresh_token:
+            if not self._creds or not self._creds.valid:
+                if self._creds and self._creds.expired and self._creds.refresh_token:
                     try:
                         # Refresh token if expired
-                        self.creds.refresh(Request())
+                        self._creds.refresh(Request())
+                        self._save_token()
                     except Exception as e:
                         print(f"Error refreshing token: {e}")
-                        self.creds = None
+                        self._creds = None
                 
                 # If still no valid credentials, start the OAuth flow
-                if not self.creds:
-                    if not os.path.exists(self.credentials_path):
+                if not self._creds:
+                    try:
+                        os.stat(self.credentials_path)
+                    except FileNotFoundError:
+                        # Create the keys directory so the credentials file can be placed there
+                        os.makedirs(os.path.dirname(self.credentials_path), exist_ok=True)
                         sys.stderr.write(
                             "Error: No credentials found. Please place your "
                             "credentials.json file in the keys directory.\n"
@@ -83,13 +192,22 @@ class GoogleAuthenticator:
                     flow = InstalledAppFlow.from_client_secrets_file(
                         self.credentials_path, self.scopes
                     )
-                    self.creds = flow.run_local_server(port=0)
+                    # Without a display the authorization URL is printed instead; open it
+                    # from a machine that can reach GOOGLE_OAUTH_PORT (e.g. over an SSH tunnel)
+                    self._creds = flow.run_local_server(
+                        port=config.GOOGLE_OAUTH_PORT,
+                        open_browser=_can_open_browser(),
+                    )
                     
                     # Save the credentials for future use
-                    with open(self.token_path, 'w') as token:
-                        token.write(str(self.creds.to_json()))
+                    self._save_token()
         
         except Exception as e:
             sys.stderr.write(f"Authentication error: {e}\n")
             sys.stderr.write("Some functionality requiring Google API access will be limited.\n")
-            self.creds = None 
\ No newline at end of file
+            self._creds = None
+
+@functools.cache
+def get_authenticator() -> GoogleAuthenticator:
+    """Get the shared Google authenticator."""
+    return GoogleAuthenticator()
\ No newline at end of file
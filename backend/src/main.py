@@ -5,6 +5,9 @@ Main entry point for the personal assistant application.
 
 import os
 import sys
+import time
+import types
+import logging
 import argparse
 from colorama import Fore, Style, init
 from dotenv import load_dotenv
@@ -17,41 +20,72 @@ if __name__ == "__main__":
 from src.agent_manager import MultiAgentSystem, AgentManager
 import src.config as config
 
-# Initialize colorama
-init()
+# Skip colors, and colorama's stdout wrapper, when asked to or when the output is not a terminal
+if os.environ.get("NO_COLOR") or not sys.stdout.isatty():
+    Fore = types.SimpleNamespace(CYAN="", GREEN="", YELLOW="", RED="")
+    Style = types.SimpleNamespace(RESET_ALL="")
+else:
+    # Initialize colorama
+    init()
+
+# Seconds between flushes of streamed text that has no line break
+_FLUSH_INTERVAL = 0.016
+
+# Colored labels printed while streaming
+_ASSISTANT_PREFIX = f"{Fore.GREEN}Assistant:{Style.RESET_ALL} "
+_TOOL_TAG = f"[{Fore.YELLOW}TOOL{Style.RESET_ALL}]"
+_ERROR_TAG = f"[{Fore.RED}ERROR{Style.RESET_ALL}]"
+_SECOND_RESPONSE_TAG = f"[{Fore.GREEN}ASSISTANT{Style.RESET_ALL}]"
+
+_BANNER = (
+    f"\n{Fore.CYAN}{'=' * 60}{Style.RESET_ALL}\n"
+    f"{Fore.CYAN}{'=' * 60}{Style.RESET_ALL}\n"
+    f"{Fore.GREEN}           Personal Assistant with Multiple Agents{Style.RESET_ALL}\n"
+    f"{Fore.CYAN}{'=' * 60}{Style.RESET_ALL}\n"
+    f"{Fore.CYAN}{'=' * 60}{Style.RESET_ALL}\n"
+)
 
 def print_banner():
     """Print a welcome banner."""
-    print(f"\n{Fore.CYAN}{'=' * 60}{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}{'=' * 60}{Style.RESET_ALL}")
-    print(f"{Fore.GREEN}           Personal Assistant with Multiple Agents{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}{'=' * 60}{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}{'=' * 60}{Style.RESET_ALL}\n")
+    print(_BANNER)
 
 def print_stream(stream_generator):
     """Print the streaming response."""
-    print(f"{Fore.GREEN}Assistant:{Style.RESET_ALL} ", end="", flush=True)
+    write = sys.stdout.write
+    flush = sys.stdout.flush
+    
+    write(_ASSISTANT_PREFIX)
+    flush()
+    last_flush = time.monotonic()
     try:
         for chunk in stream_generator:
-            if isinstance(chunk, dict):
-                # Handle dictionary chunks (when using AgentManager directly)
-                if chunk["type"] == "content":
-                    print(chunk["content"], end="", flush=True)
-                elif chunk["type"] == "tool_start":
-                    print(f"\n[{Fore.YELLOW}TOOL{Style.RESET_ALL}] Running {chunk['name']}...\n", end="", flush=True)
-                elif chunk["type"] == "tool_result":
-                    result = chunk["result"].replace("\n", "\n  ")  # Indent result
-                    print(f"  {result}\n", end="", flush=True)
-                elif chunk["type"] == "tool_error":
-                    print(f"\n[{Fore.RED}ERROR{Style.RESET_ALL}] {chunk['error']}\n", end="", flush=True)
-                elif chunk["type"] == "second_response_start":
-                    print(f"\n[{Fore.GREEN}ASSISTANT{Style.RESET_ALL}] ", end="", flush=True)
+            if chunk["type"] == "content":
+                text = chunk["content"]
+            elif chunk["type"] == "tool_start":
+                text = f"\n{_TOOL_TAG} Running {chunk['name']}...\n"
+            elif chunk["type"] == "tool_result":
+                # Indent result line by line instead of copying it with the indentation added
+                for line in chunk["result"].splitlines(keepends=True):
+                    write("  ")
+                    write(line)
+                text = "\n"
+            elif chunk["type"] == "tool_error":
+                text = f"\n{_ERROR_TAG} {chunk['error']}\n"
+            elif chunk["type"] == "second_response_start":
+                text = f"\n{_SECOND_RESPONSE_TAG} "
             else:
-                # Handle string chunks (when using MultiAgentSystem)
-                print(chunk, end="", flush=True)
+                continue
+            
+            write(text)
+            # Flush on line ends, or often enough for the text to still look streamed
+            now = time.monotonic()
+            if "\n" in text or now - last_flush >= _FLUSH_INTERVAL:
+                flush()
+                last_flush = now
     except Exception as e:
-        print(f"\n{Fore.RED}Error during streaming: {e}{Style.RESET_ALL}")
-    print()  # Add a newline at the end
+        write(f"\n{Fore.RED}Error during streaming: {e}{Style.RESET_ALL}\n")
+    write("\n")  # Add a newline at the end
+    flush()
 
 def main():
     """Run the personal assistant application."""
@@ -71,6 +105,10 @@ def main():
     if args.debug:
         os.environ["DEBUG_MODE"] = "True"
     
+    # Log lines would land in the middle of the streamed answer, so only warnings
+    # are shown unless debugging (config was imported before --debug was parsed)
+    logging.basicConfig(level="DEBUG" if args.debug or config.DEBUG_MODE else "WARNING")
+    
     # Check if API key is available
     if not config.OPENAI_API_KEY:
         print(f"{Fore.RED}Error: OPENAI_API_KEY environment variable not set.{Style.RESET_ALL}")
@@ -95,7 +133,7 @@ def main():
         
         # Check for exit conditions
         if user_input.strip().lower() in ['exit', 'quit', 'stop', 'bye']:
-            print(f"\n{Fore.GREEN}Assistant:{Style.RESET_ALL} Goodbye! Have a great day.")
+            print(f"\n{_ASSISTANT_PREFIX}Goodbye! Have a great day.")
             break
         
         # Process the user input
@@ -1,42 +1,118 @@
 """
 Memory system for storing conversation history and other contextual information.
 """
-from typing import List, Dict, Any, Optional
-import json
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Literal
+from datetime import datetime, timezone
+from collections import deque
 import os
-from pydantic import BaseModel, Field
-from src.config import MEMORY_KEY, MEMORY_RETURN_MESSAGES
+import json
+import time
+import tiktoken
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError
+from src.config import MEMORY_KEY, MEMORY_RETURN_MESSAGES, DEFAULT_MODEL
+
+# Buffered writes are flushed early once they exceed this many characters
+_MAX_BUFFER_SIZE = 64 * 1024
+
+# Tokens added by the chat format around each message
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+# Rough characters per token, used when the tokenizer cannot be loaded
+_CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_failed = False
+
+def _get_encoding() -> Optional["tiktoken.Encoding"]:
+    """Get the tokenizer for the default model, loading it on first use, or None if it cannot be loaded."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            try:
+                _encoding = tiktoken.encoding_for_model(DEFAULT_MODEL)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # The BPE file is downloaded on first use, which fails offline; don't retry every message
+            print(f"Error loading tokenizer, estimating token counts instead: {e}")
+            _encoding_failed = True
+    return _encoding
+
+def _count_tokens(text: str) -> int:
+    """Count the tokens in a text, or estimate them when the tokenizer is unavailable."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // _CHARS_PER_TOKEN
+    # Special token strings in the text are counted as plain text instead of raising
+    return len(encoding.encode(text, disallowed_special=()))
+
+# Timestamps are reused for this many seconds, so bursts of messages share one
+_TIMESTAMP_RESOLUTION = 0.05
+
+_timestamp_cache = [0.0, ""]
+
+def _now_iso() -> str:
+    """Get the current UTC time in ISO format, computed at most once per resolution step."""
+    now = time.time()
+    if now - _timestamp_cache[0] > _TIMESTAMP_RESOLUTION:
+        _timestamp_cache[0] = now
+        _timestamp_cache[1] = datetime.fromtimestamp(now, timezone.utc).isoformat()
+    return _timestamp_cache[1]
 
 class Message(BaseModel):
     """Represents a single message in the conversation."""
     role: str
     content: str
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
+    timestamp: str = Field(default_factory=_now_iso)
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    
+    # Messages are immutable by convention, so derived values are computed once
+    _cached_json: Optional[str] = PrivateAttr(default=None)
+    _cached_token_count: Optional[int] = PrivateAttr(default=None)
+    
+    def dump_json(self) -> str:
+        """Serialize the message to JSON, reusing the previous result."""
+        if self._cached_json is None:
+            self._cached_json = self.model_dump_json()
+        return self._cached_json
 
 class ConversationMemory:
     """Manages conversation history and provides context for the agents."""
     
     def __init__(self, 
                  memory_file: Optional[str] = None, 
-                 max_tokens: int = 8000):
+                 max_tokens: int = 8000,
+                 load_limit: Optional[int] = None):
         """
         Initialize the conversation memory system.
         
         Args:
             memory_file: Optional path to save/load memory from.
             max_tokens: Maximum number of tokens to maintain in memory.
+            load_limit: Optional limit on the number of messages loaded from the
+                file, besides the leading system message. Older messages stay
+                in the file but are not loaded.
         """
         self.messages: List[Message] = []
         self.memory_file = memory_file
         self.max_tokens = max_tokens
+        self.load_limit = load_limit
+        self._write_buffer: List[str] = []
+        self._write_buffer_size = 0
+        
+        if self.memory_file and os.path.dirname(self.memory_file):
+            os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
+        
+        self._migrate_legacy_memory()
         self._load_memory()
     
     def add_message(self, role: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
         """
         Add a message to the conversation history.
         
+        Writes are buffered and flushed once the turn ends with a final
+        assistant message, or when the buffer grows too large.
+        
         Args:
             role: The role of the message sender (user, assistant, system, or tool).
             content: The content of the message.
@@ -45,7 +121,21 @@ class ConversationMemory:
         metadata = metadata or {}
         message = Message(role=role, content=content, metadata=metadata)
         self.messages.append(message)
-        self._save_memory()
+        self._append_message(message)
+        
+        end_of_turn = role == "assistant" and "tool_calls" not in metadata
+        if end_of_turn or self._write_buffer_size > _MAX_BUFFER_SIZE:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Write all buffered messages to the memory file in a single call."""
+        if not self._write_buffer:
+            return
+        
+        with open(self.memory_file, "a", encoding="utf-8") as f:
+            f.write("".join(self._write_buffer))
+        self._write_buffer = []
+        self._write_buffer_size = 0
     
     def get_messages(self, limit: Optional[int] = None) -> List[Message]:
         """
@@ -64,19 +154,34 @@ class ConversationMemory:
     def clear(self) -> None:
         """Clear the conversation history."""
         self.messages = []
-        self._save_memory()
+        self._write_buffer = []
+        self._write_buffer_size = 0
+        if self.memory_file:
+            open(self.memory_file, "w").close()
     
-    def as_openai_messages(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    def as_openai_messages(self, 
+                           limit: Optional[int] = None,
+                           cache_style: Literal["none", "anthropic"] = "none") -> List[Dict[str, Any]]:
         """
         Convert memory to OpenAI message format.
         
+        The leading system message and the current turn, from the last user
+        message on, are always kept. Older messages are limited to the most
+        recent `limit` ones and trimmed further from the oldest end until they
+        fit in `max_tokens`. Tool results whose assistant
+        tool call fell outside the window are dropped, so every tool_call_id
+        sent still references a message in the window.
+        
         Args:
-            limit: Optional limit on the number of messages to return.
+            limit: Optional limit on the number of non-system messages to return.
+            cache_style: With "anthropic", add ephemeral cache_control breakpoints
+                on the system message and on the last user message before the
+                current turn.
             
         Returns:
             List of dictionaries in OpenAI message format.
         """
-        messages = self.get_messages(limit)
+        messages = self._context_window(limit)
         result = []
         
         for message in messages:
@@ -99,27 +204,161 @@ class ConversationMemory:
             
             result.append(msg_dict)
         
+        if cache_style == "anthropic":
+            self._add_cache_breakpoints(result)
+        
         return result
     
-    def _save_memory(self) -> None:
-        """Save memory to file if a memory file is specified."""
+    def _context_window(self, limit: Optional[int] = None) -> List[Message]:
+        """Select the leading system message plus the recent messages that fit the budget."""
+        head = self.messages[:1] if self.messages and self.messages[0].role == "system" else []
+        tail = self.messages[len(head):]
+        
+        # The current turn, from the last user message on, is always sent in full
+        current = len(tail) - 1
+        while current >= 0 and tail[current].role != "user":
+            current -= 1
+        if current < 0:
+            # No user message at all, keep at least the newest message
+            current = len(tail) - 1
+        
+        if limit and len(tail) > limit:
+            offset = min(len(tail) - limit, max(current, 0))
+            tail = tail[offset:]
+            current -= offset
+        
+        counts = [self._token_count(m) for m in tail]
+        total = sum(counts) + sum(self._token_count(m) for m in head)
+        
+        # Drop the oldest turns over budget, never reaching into the current one
+        start = 0
+        while start < current and total > self.max_tokens:
+            total -= counts[start]
+            start += 1
+        
+        # Never start the window with tool results orphaned from their tool call
+        while start < len(tail) and tail[start].role == "tool":
+            start += 1
+        
+        return head + tail[start:]
+    
+    def _token_count(self, message: Message) -> int:
+        """Approximate the number of prompt tokens a message will use."""
+        if message._cached_token_count is None:
+            count = _MESSAGE_OVERHEAD_TOKENS + _count_tokens(message.content)
+            for tool_call in message.metadata.get("tool_calls", []):
+                function = tool_call.get("function", {})
+                count += _count_tokens(function.get("name", "") + function.get("arguments", ""))
+            message._cached_token_count = count
+        return message._cached_token_count
+    
+    def _add_cache_breakpoints(self, messages: List[Dict[str, Any]]) -> None:
+        """Mark the stable prefix of the conversation as cacheable, in place."""
+        user_indices = [i for i, m in enumerate(messages) if m["role"] == "user"]
+        breakpoints = [i for i, m in enumerate(messages) if m["role"] == "system"][:1]
+        
+        # The user message preceding the current turn ends the sliding window
+        if len(user_indices) >= 2:
+            breakpoints.append(user_indices[-2])
+        
+        for index in breakpoints:
+            messages[index]["content"] = [{
+                "type": "text",
+                "text": messages[index]["content"],
+                "cache_control": {"type": "ephemeral"}
+            }]
+    
+    def compact(self) -> None:
+        """
+        Rewrite the memory file without the lines that cannot be parsed.
+        
+        The file is only ever appended to, so this drops what is left of a
+        write interrupted by a crash. The file is filtered line by line, so
+        messages that were not loaded into memory are kept.
+        """
+        if not self.memory_file:
+            return
+        
+        self.flush()
+        
+        tmp_file = f"{self.memory_file}.tmp"
+        with open(self.memory_file, "rb") as source, open(tmp_file, "wb") as target:
+            for line in source:
+                if not line.strip():
+                    continue
+                try:
+                    Message.model_validate_json(line)
+                except ValidationError:
+                    continue
+                target.write(line if line.endswith(b"\n") else line + b"\n")
+        os.replace(tmp_file, self.memory_file)
+    
+    def _append_message(self, message: Message) -> None:
+        """Queue a single message for the memory file if one is specified."""
         if not self.memory_file:
             return
         
-        os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
+        line = message.dump_json() + "\n"
+        self._write_buffer.append(line)
+        self._write_buffer_size += len(line)
+    
+    def _migrate_legacy_memory(self) -> None:
+        """
+        Convert a memory file from the old JSON format to JSONL.
+        
+        Memory used to be saved as one JSON array next to where the JSONL file
+        now lives, e.g. memory.json for memory.jsonl. It is only converted when
+        the JSONL file does not exist yet, and the old file is left in place.
+        """
+        if not self.memory_file or os.path.exists(self.memory_file):
+            return
+        
+        root, ext = os.path.splitext(self.memory_file)
+        legacy_file = f"{root}.json"
+        if ext != ".jsonl" or not os.path.exists(legacy_file):
+            return
         
-        with open(self.memory_file, "w") as f:
-            json.dump([m.model_dump() for m in self.messages], f, indent=2)
+        try:
+            with open(legacy_file, "r") as f:
+                messages = [Message.model_validate(m) for m in json.load(f)]
+        except (json.JSONDecodeError, ValidationError, TypeError) as e:
+            print(f"Error migrating memory from {legacy_file}: {e}")
+            return
+        
+        tmp_file = f"{self.memory_file}.tmp"
+        with open(tmp_file, "w") as f:
+            f.writelines(m.dump_json() + "\n" for m in messages)
+        os.replace(tmp_file, self.memory_file)
     
     def _load_memory(self) -> None:
-        """Load memory from file if it exists."""
+        """Load memory from the JSONL file if it exists, parsing one line at a time."""
         if not self.memory_file or not os.path.exists(self.memory_file):
             return
         
+        skipped = 0
         try:
-            with open(self.memory_file, "r") as f:
-                data = json.load(f)
-                self.messages = [Message(**m) for m in data]
-        except (json.JSONDecodeError, FileNotFoundError) as e:
+            with open(self.memory_file, "rb") as f:
+                lines = (line for line in f if line.strip())
+                first = next(lines, None)
+                # Only the last load_limit lines are held, the rest are streamed past
+                recent = deque(lines, maxlen=self.load_limit)
+        except FileNotFoundError as e:
             print(f"Error loading memory: {e}")
-            self.messages = [] 
\ No newline at end of file
+            return
+        
+        candidates = [first] if first is not None else []
+        candidates.extend(recent)
+        for line in candidates:
+            try:
+                self.messages.append(Message.model_validate_json(line))
+            except ValidationError:
+                skipped += 1
+        
+        # The first line is only kept beyond the limit when it is the system message
+        if (self.load_limit is not None and len(self.messages) > self.load_limit 
+                and self.messages[0].role != "system"):
+            self.messages.pop(0)
+        
+        if skipped:
+            print(f"Error loading memory: skipped {skipped} malformed line(s)")
+            self.compact()
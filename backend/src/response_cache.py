@@ -0,0 +1,111 @@
+"""
+Cache of assistant responses for repeated user inputs.
+"""
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+import hashlib
+import re
+import time
+
+from src.memory import Message
+import src.config as config
+
+# Inputs about time-dependent data only stay valid for a short time
+_VOLATILE_PATTERN = re.compile(
+    r'\b(?:today|tomorrow|yesterday|now|calendar|event|meeting|schedule|email|inbox|time)s?\b',
+    re.IGNORECASE
+)
+
+class ResponseCache:
+    """
+    LRU cache of responses that did not use any tools, keyed by normalized user input.
+    
+    An entry only matches when the recent conversation context is one it was
+    produced in, so context-dependent inputs ("tell me more") are not answered
+    from a different conversation.
+    """
+    
+    def __init__(self, max_size: int = config.RESPONSE_CACHE_SIZE):
+        """
+        Initialize the response cache.
+        
+        Args:
+            max_size: Maximum number of entries to keep.
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    
+    @staticmethod
+    def context_hash(messages: List[Message]) -> str:
+        """
+        Hash the roles and contents of the given messages.
+        
+        Args:
+            messages: The recent messages of the conversation.
+        
+        Returns:
+            A hex digest identifying the context.
+        """
+        digest = hashlib.sha1()
+        for message in messages:
+            digest.update(f"{message.role}\0{message.content}\0".encode())
+        return digest.hexdigest()
+    
+    def get(self, user_input: str, context_hash: str) -> Optional[str]:
+        """
+        Look up a cached response.
+        
+        Args:
+            user_input: The user's input message.
+            context_hash: Hash of the context the input is asked in.
+        
+        Returns:
+            The cached response, or None if there is no valid entry.
+        """
+        key = self._key(user_input)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        if entry["expires"] < time.monotonic():
+            del self._entries[key]
+            return None
+        
+        if context_hash not in entry["contexts"]:
+            return None
+        
+        self._entries.move_to_end(key)
+        return entry["response"]
+    
+    def put(self, user_input: str, response: str, *context_hashes: str) -> None:
+        """
+        Store a response, or add contexts to the entry if it already holds it.
+        
+        Args:
+            user_input: The user's input message.
+            response: The assistant's response.
+            context_hashes: Hashes of the contexts the response is valid in.
+        """
+        key = self._key(user_input)
+        entry = self._entries.get(key)
+        
+        if entry is None or entry["response"] != response or entry["expires"] < time.monotonic():
+            volatile = _VOLATILE_PATTERN.search(user_input)
+            ttl = config.RESPONSE_CACHE_VOLATILE_TTL if volatile else config.RESPONSE_CACHE_TTL
+            entry = {"response": response, "expires": time.monotonic() + ttl, "contexts": set()}
+            self._entries[key] = entry
+        
+        entry["contexts"].update(context_hashes)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+    
+    @staticmethod
+    def _key(user_input: str) -> str:
+        """Build the cache key for a user input, ignoring case and whitespace."""
+        return hashlib.sha1(" ".join(user_input.lower().split()).encode()).hexdigest()
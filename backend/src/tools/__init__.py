@@ -3,7 +3,7 @@ Tools package initialization.
 """
 
 # Make tools available when importing the package
-from src.tools.base import BaseTool, ToolRegistry, register_tool
+from src.tools.base import BaseTool, BatchableTool, ToolRegistry, register_tool
 from src.tools.calendar_tools import (
     AddEventTool,
     GetEventsByTimeTool,
@@ -16,6 +16,7 @@ from src.tools.email_tools import (
     FetchLatestEmailsTool,
     SearchEmailsTool,
     FetchEmailsByDateTool,
+    GetEmailBodyTool,
 )
 from src.tools.utility_tools import (
     GetCurrentTimeTool,
@@ -35,6 +36,7 @@ def initialize_tools():
 
 __all__ = [
     "BaseTool",
+    "BatchableTool",
     "ToolRegistry",
     "register_tool",
     "AddEventTool",
@@ -46,6 +48,7 @@ __all__ = [
     "FetchLatestEmailsTool",
     "SearchEmailsTool",
     "FetchEmailsByDateTool",
+    "GetEmailBodyTool",
     "GetCurrentTimeTool",
     "GetDateInfoTool",
     "CalculateDateDifferenceTool",
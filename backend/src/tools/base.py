@@ -1,11 +1,13 @@
 """
 Base tool class and tool registration system.
 """
-from typing import Dict, Any, List, Optional, Callable, Type, ClassVar
+from typing import Dict, Any, List, Optional, Callable, Type, ClassVar, Tuple
 from pydantic import BaseModel, Field, create_model
 import inspect
+import functools
 from abc import ABC, abstractmethod
 import json
+import orjson
 import sys
 import os
 
@@ -30,9 +32,11 @@ class BaseTool(ABC):
         return cls.description
     
     @classmethod
+    @functools.lru_cache(maxsize=None)
     def create_arguments_model(cls) -> Type[BaseModel]:
-        """Create a Pydantic model for the tool's arguments based on the execute method."""
-        method = cls.execute
+        """Create a Pydantic model for the tool's arguments based on the execute method (cached per class)."""
+        # Batchable tools take their arguments in prepare, execute only forwards them
+        method = cls.prepare if issubclass(cls, BatchableTool) else cls.execute
         signature = inspect.signature(method)
         
         # Skip the first parameter (self)
@@ -50,8 +54,9 @@ class BaseTool(ABC):
         return create_model(f"{cls.__name__}Arguments", **fields)
     
     @classmethod
+    @functools.lru_cache(maxsize=None)
     def get_openai_schema(cls) -> Dict[str, Any]:
-        """Convert the tool to OpenAI's function schema format."""
+        """Convert the tool to OpenAI's function schema format (cached per class)."""
         model = cls.create_arguments_model()
         schema = model.model_json_schema()
         
@@ -69,15 +74,49 @@ class BaseTool(ABC):
         """Execute the tool with the given arguments."""
         pass
 
+class BatchableTool(BaseTool):
+    """
+    Base class for tools whose calls can share one batched API request.
+    
+    prepare builds the tool's request and defines its arguments, execute_batch
+    sends the requests of several calls at once. Calls to tools with the same
+    batch_key are sent together by ToolRegistry.execute_batch.
+    """
+    
+    batch_key: ClassVar[str]
+    
+    @abstractmethod
+    def prepare(self, *args, **kwargs) -> Tuple[Any, Callable[[Any], str]]:
+        """Build the request for a call, and the function turning its response into the result."""
+        pass
+    
+    @classmethod
+    @abstractmethod
+    def execute_batch(cls, calls: List[Tuple[Type["BatchableTool"], Dict[str, Any]]]) -> List[str]:
+        """Execute calls to tools sharing this tool's batch_key, returning their results in order."""
+        pass
+
 class ToolRegistry:
     """Registry for all available tools."""
     
     _tools: Dict[str, Type[BaseTool]] = {}
+    _tool_list: Optional[List[Type[BaseTool]]] = None
+    _cached_schema: Optional[List[Dict[str, Any]]] = None
+    _cached_schema_bytes: Optional[bytes] = None
+    # Incremented on every registration so callers can detect a changed tool set
+    version: int = 0
     
     @classmethod
     def register(cls, tool_class: Type[BaseTool]) -> Type[BaseTool]:
         """Register a tool class."""
         cls._tools[tool_class.get_name()] = tool_class
+        cls._tool_list = None
+        cls._cached_schema = None
+        cls._cached_schema_bytes = None
+        cls.version += 1
+        
+        # Build the schema once at registration instead of on the first request
+        tool_class.get_openai_schema()
         return tool_class
     
     @classmethod
@@ -88,12 +127,23 @@ class ToolRegistry:
     @classmethod
     def get_all_tools(cls) -> List[Type[BaseTool]]:
         """Get all registered tool classes."""
-        return list(cls._tools.values())
+        if cls._tool_list is None:
+            cls._tool_list = list(cls._tools.values())
+        return cls._tool_list
     
     @classmethod
     def get_openai_tools_schema(cls) -> List[Dict[str, Any]]:
-        """Get the OpenAI tools schema for all registered tools."""
-        return [tool.get_openai_schema() for tool in cls.get_all_tools()]
+        """Get the OpenAI tools schema for all registered tools (built once, shared by all callers)."""
+        if cls._cached_schema is None:
+            cls._cached_schema = [tool.get_openai_schema() for tool in cls.get_all_tools()]
+        return cls._cached_schema
+    
+    @classmethod
+    def get_openai_tools_schema_bytes(cls) -> bytes:
+        """Get the OpenAI tools schema serialized as JSON bytes (built once, shared by all callers)."""
+        if cls._cached_schema_bytes is None:
+            cls._cached_schema_bytes = orjson.dumps(cls.get_openai_tools_schema())
+        return cls._cached_schema_bytes
     
     @classmethod
     def execute_tool(cls, name: str, args: Dict[str, Any]) -> Any:
@@ -104,6 +154,20 @@ class ToolRegistry:
         
         tool_instance = tool_class()
         return tool_instance.execute(**args)
+    
+    @classmethod
+    def execute_batch(cls, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """Execute calls to batchable tools sharing one batch_key, given by name and arguments."""
+        tool_classes = []
+        for name, _ in calls:
+            tool_class = cls.get_tool(name)
+            if not tool_class:
+                raise ValueError(f"Tool '{name}' not found")
+            tool_classes.append(tool_class)
+        
+        return tool_classes[0].execute_batch([
+            (tool_class, args) for tool_class, (_, args) in zip(tool_classes, calls)
+        ])
 
 def register_tool(cls: Type[BaseTool]) -> Type[BaseTool]:
     """Decorator to register a tool class."""
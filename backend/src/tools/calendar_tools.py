@@ -1,10 +1,14 @@
 """
 Calendar-related tools for interacting with Google Calendar.
 """
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Callable, Iterator, Tuple, Type, Union
+from datetime import datetime, timedelta, timezone
 import pytz
+import functools
+import threading
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest, BatchHttpRequest
 import sys
 import os
 
@@ -12,65 +16,204 @@ import os
 if __name__ == "__main__":
     sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from src.tools.base import BaseTool, register_tool
-from src.google_authenticator import GoogleAuthenticator
+from src.tools.base import BaseTool, BatchableTool, register_tool
+from src.google_authenticator import get_authenticator
 import src.config as config
 
+# User timezone for naive event times, looked up once instead of per tool call
+_TZ = pytz.timezone(config.TIMEZONE)
+
+# Partial response selectors, only the event fields format_event reads
+_EVENT_FIELDS = 'id,summary,location,description,start(dateTime,date),end(dateTime,date)'
+_EVENT_LIST_FIELDS = f'items({_EVENT_FIELDS})'
+
+def _error_message(action: str, error: Exception) -> str:
+    """
+    Turn an exception raised by a tool into an error message for the model.
+    
+    Rate limits and server errors are reported as temporary, so the agent knows
+    that retrying the call may succeed.
+    """
+    if isinstance(error, HttpError) and (error.resp.status == 429 or error.resp.status >= 500):
+        return f"Temporary error {action}, retrying may succeed: {error}"
+    return f"Error {action}: {error}"
+
+def _tool_errors(action: str) -> Callable:
+    """
+    Turn exceptions raised by a tool's execute method into an error message for the model.
+    
+    Args:
+        action: What the tool was doing, used in the message (e.g. "adding event").
+        
+    Returns:
+        The decorator.
+    """
+    def decorator(execute: Callable) -> Callable:
+        @functools.wraps(execute)
+        def wrapper(*args, **kwargs) -> str:
+            try:
+                return execute(*args, **kwargs)
+            except Exception as e:
+                return _error_message(action, e)
+        return wrapper
+    return decorator
+
+def _to_tz_iso(time_str: str) -> str:
+    """Return an ISO 8601 time with timezone, localizing naive times to the user's timezone."""
+    # Only the time part can hold an offset, the date part always has dashes
+    if time_str[-1] == 'Z' or '+' in time_str[10:] or '-' in time_str[10:]:
+        return time_str
+    return _TZ.localize(datetime.strptime(time_str, config.DATE_FORMAT)).isoformat()
+
 class CalendarClient:
     """Handles interaction with the Google Calendar API."""
     
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(CalendarClient, cls).__new__(cls)
-            cls._instance._initialize()
-        return cls._instance
+    _TEMPLATE = (
+        "Event: {summary}\n"
+        "ID: {id}\n"
+        "Location: {location}\n"
+        "Start: {start}\n"
+        "End: {end}\n"
+        "Description: {description}\n"
+    )
     
-    def _initialize(self):
+    def __init__(self):
         """Initialize the calendar client."""
-        self.authenticator = GoogleAuthenticator()
-        self.service = build('calendar', 'v3', credentials=self.authenticator.creds)
+        self.authenticator = get_authenticator()
+        self._service = None
+        self._service_lock = threading.Lock()
+    
+    @property
+    def service(self):
+        """Get the Calendar service, building it on first access."""
+        self.authenticator.ensure_valid()
+        if self._service is None:
+            with self._service_lock:
+                if self._service is None:
+                    # Use the discovery document bundled with the client library, no fetch or cache lookup
+                    self._service = build(
+                        'calendar', 'v3',
+                        credentials=self.authenticator.creds,
+                        static_discovery=True,
+                        cache_discovery=False
+                    )
+        return self._service
+    
+    def execute(self, request: Union[HttpRequest, BatchHttpRequest]) -> Any:
+        """Execute a request or batch on one of the authenticator's pooled HTTP transports."""
+        return self.authenticator.execute(request)
     
     def format_event(self, event: Dict[str, Any]) -> str:
         """Format an event dictionary into a readable string."""
-        start = event.get('start', {}).get('dateTime', event.get('start', {}).get('date', 'No start time'))
-        end = event.get('end', {}).get('dateTime', event.get('end', {}).get('date', 'No end time'))
-        summary = event.get('summary', 'No title')
-        location = event.get('location', 'No location')
-        description = event.get('description', 'No description')
-        event_id = event.get('id', 'No ID')
-        
-        return (
-            f"Event: {summary}\n"
-            f"ID: {event_id}\n"
-            f"Location: {location}\n"
-            f"Start: {start}\n"
-            f"End: {end}\n"
-            f"Description: {description}\n"
-        )
+        start = event.get('start') or {}
+        end = event.get('end') or {}
+        
+        return self._TEMPLATE.format_map({
+            'summary': event.get('summary', 'No title'),
+            'id': event.get('id', 'No ID'),
+            'location': event.get('location', 'No location'),
+            'start': start.get('dateTime') or start.get('date') or 'No start time',
+            'end': end.get('dateTime') or end.get('date') or 'No end time',
+            'description': event.get('description', 'No description')
+        })
     
-    def format_events(self, events: List[Dict[str, Any]]) -> List[str]:
-        """Format a list of event dictionaries into readable strings."""
-        return [self.format_event(event) for event in events]
+    def format_events(self, events: List[Dict[str, Any]]) -> Iterator[str]:
+        """Format a list of event dictionaries into readable strings, lazily."""
+        return (self.format_event(event) for event in events)
+
+@functools.cache
+def get_calendar_client() -> CalendarClient:
+    """Get the shared calendar client."""
+    return CalendarClient()
+
+class _EventMutationTool(BatchableTool):
+    """
+    Base class for the tools that create, change or delete a single event.
+    
+    Several such calls made in one model response are sent as a single batch
+    HTTP request instead of one request each.
+    """
+    
+    batch_key = "calendar_events"
+    # What the tool does, used in its error messages (e.g. "adding event")
+    action: str
+    
+    def execute(self, **kwargs) -> str:
+        """Send the request built by prepare and return the result."""
+        try:
+            request, render = self.prepare(**kwargs)
+            return render(get_calendar_client().execute(request))
+        except Exception as e:
+            return _error_message(self.action, e)
+    
+    @classmethod
+    def execute_batch(cls, calls: List[Tuple[Type[BatchableTool], Dict[str, Any]]]) -> List[str]:
+        """
+        Send the requests of several event mutations in one batch.
+        
+        Each call still gets its own result or error message, from its own
+        response in the batch.
+        
+        Args:
+            calls: The tool classes and arguments of the calls.
+            
+        Returns:
+            The results of the calls, in order.
+        """
+        client = get_calendar_client()
+        results: List[Optional[str]] = [None] * len(calls)
+        pending: Dict[int, Tuple[_EventMutationTool, Callable[[Any], str]]] = {}
+        
+        def collect(request_id: str, response: Any, exception: Optional[Exception]) -> None:
+            index = int(request_id)
+            tool, render = pending[index]
+            try:
+                if exception is not None:
+                    raise exception
+                results[index] = render(response)
+            except Exception as e:
+                results[index] = _error_message(tool.action, e)
+        
+        batch = client.service.new_batch_http_request(callback=collect)
+        for index, (tool_class, args) in enumerate(calls):
+            tool = tool_class()
+            try:
+                request, render = tool.prepare(**args)
+            except Exception as e:
+                results[index] = _error_message(tool.action, e)
+                continue
+            pending[index] = (tool, render)
+            batch.add(request, request_id=str(index))
+        
+        if pending:
+            try:
+                client.execute(batch)
+            except Exception as e:
+                # The batch itself failed, so the calls it did not answer failed with it
+                for index, (tool, _) in pending.items():
+                    if results[index] is None:
+                        results[index] = _error_message(tool.action, e)
+        
+        return results
 
 @register_tool
-class AddEventTool(BaseTool):
+class AddEventTool(_EventMutationTool):
     """Tool for adding an event to Google Calendar."""
     
     name = "add_calendar_event"
     description = "Add an event to the user's Google Calendar"
+    action = "adding event"
     
-    def execute(
+    def prepare(
         self,
         summary: str,
         location: str,
         description: str,
         start_time: str,
         end_time: str,
-    ) -> str:
+    ) -> Tuple[HttpRequest, Callable[[Any], str]]:
         """
-        Add an event to Google Calendar.
+        Build the request adding an event to Google Calendar.
         
         Args:
             summary: The title of the event.
@@ -80,49 +223,43 @@ class AddEventTool(BaseTool):
             end_time: The event's end time in ISO 8601 format (YYYY-MM-DDTHH:MM).
             
         Returns:
-            A confirmation message with the event details.
+            The request, and a function turning the created event into a confirmation message.
         """
-        try:
-            client = CalendarClient()
-            
-            # Ensure times have timezone information
-            tz = pytz.timezone(config.TIMEZONE)
-            
-            if not start_time.endswith('Z') and '+' not in start_time:
-                dt = datetime.strptime(start_time, config.DATE_FORMAT)
-                start_time = tz.localize(dt).isoformat()
-            
-            if not end_time.endswith('Z') and '+' not in end_time:
-                dt = datetime.strptime(end_time, config.DATE_FORMAT)
-                end_time = tz.localize(dt).isoformat()
-            
-            event = {
-                'summary': summary,
-                'location': location,
-                'description': description,
-                'start': {
-                    'dateTime': start_time,
-                    'timeZone': config.TIMEZONE,
-                },
-                'end': {
-                    'dateTime': end_time,
-                    'timeZone': config.TIMEZONE,
-                },
-            }
-            
-            created_event = client.service.events().insert(
-                calendarId=config.CALENDAR_ID, 
-                body=event
-            ).execute()
-            
+        client = get_calendar_client()
+        
+        # Ensure times have timezone information
+        start_time = _to_tz_iso(start_time)
+        end_time = _to_tz_iso(end_time)
+        
+        event = {
+            'summary': summary,
+            'location': location,
+            'description': description,
+            'start': {
+                'dateTime': start_time,
+                'timeZone': config.TIMEZONE,
+            },
+            'end': {
+                'dateTime': end_time,
+                'timeZone': config.TIMEZONE,
+            },
+        }
+        
+        request = client.service.events().insert(
+            calendarId=config.CALENDAR_ID, 
+            body=event,
+            fields='htmlLink'
+        )
+        
+        def render(created_event: Dict[str, Any]) -> str:
             return (
                 f"Event created successfully!\n"
                 f"Event: {summary}\n"
                 f"When: {start_time} to {end_time}\n"
                 f"Link: {created_event.get('htmlLink')}"
             )
-        except Exception as e:
-            return f"Error adding event: {str(e)}"
+        
+        return request, render
 
 @register_tool
 class GetEventsByTimeTool(BaseTool):
@@ -131,6 +268,7 @@ class GetEventsByTimeTool(BaseTool):
     name = "get_calendar_events_by_time"
     description = "Get events from the user's Google Calendar within a specified time range"
     
+    @_tool_errors("getting events")
     def execute(
         self,
         start_time: str,
@@ -148,38 +286,28 @@ class GetEventsByTimeTool(BaseTool):
         Returns:
             A formatted list of events.
         """
-        try:
-            client = CalendarClient()
-            
-            # Ensure times have timezone information
-            tz = pytz.timezone(config.TIMEZONE)
-            
-            if not start_time.endswith('Z') and '+' not in start_time:
-                dt = datetime.strptime(start_time, config.DATE_FORMAT)
-                start_time = tz.localize(dt).isoformat()
-            
-            if not end_time.endswith('Z') and '+' not in end_time:
-                dt = datetime.strptime(end_time, config.DATE_FORMAT)
-                end_time = tz.localize(dt).isoformat()
-            
-            events_result = client.service.events().list(
-                calendarId=config.CALENDAR_ID,
-                timeMin=start_time,
-                timeMax=end_time,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime',
-            ).execute()
-            
-            events = events_result.get('items', [])
-            
-            if not events:
-                return f"No events found between {start_time} and {end_time}."
-            
-            formatted_events = client.format_events(events)
-            return "Events found:\n\n" + "\n\n".join(formatted_events)
-        except Exception as e:
-            return f"Error getting events: {str(e)}"
+        client = get_calendar_client()
+        
+        # Ensure times have timezone information
+        start_time = _to_tz_iso(start_time)
+        end_time = _to_tz_iso(end_time)
+        
+        events_result = client.execute(client.service.events().list(
+            calendarId=config.CALENDAR_ID,
+            timeMin=start_time,
+            timeMax=end_time,
+            maxResults=max_results,
+            singleEvents=True,
+            orderBy='startTime',
+            fields=_EVENT_LIST_FIELDS,
+        ))
+        
+        events = events_result.get('items', [])
+        
+        if not events:
+            return f"No events found between {start_time} and {end_time}."
+        
+        return "Events found:\n\n" + "\n\n".join(client.format_events(events))
 
 @register_tool
 class GetEventsByQueryTool(BaseTool):
@@ -188,6 +316,7 @@ class GetEventsByQueryTool(BaseTool):
     name = "get_calendar_events_by_query"
     description = "Search for events in the user's Google Calendar by keyword"
     
+    @_tool_errors("searching for events")
     def execute(
         self,
         query: str,
@@ -203,79 +332,68 @@ class GetEventsByQueryTool(BaseTool):
         Returns:
             A formatted list of events matching the query.
         """
-        try:
-            client = CalendarClient()
-            
-            # Set time range to include past and future events
-            now = datetime.now().isoformat() + 'Z'
-            one_year_future = (datetime.now() + timedelta(days=365)).isoformat() + 'Z'
-            
-            events_result = client.service.events().list(
-                calendarId=config.CALENDAR_ID,
-                q=query,
-                timeMin=now,
-                timeMax=one_year_future,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime',
-            ).execute()
-            
-            events = events_result.get('items', [])
-            
-            if not events:
-                return f"No events found matching '{query}'."
-            
-            formatted_events = client.format_events(events)
-            return f"Events matching '{query}':\n\n" + "\n\n".join(formatted_events)
-        except Exception as e:
-            return f"Error searching for events: {str(e)}"
+        client = get_calendar_client()
+        
+        # Set time range to include past and future events
+        now_utc = datetime.now(timezone.utc)
+        now = now_utc.strftime('%Y-%m-%dT%H:%M:%SZ')
+        one_year_future = (now_utc + timedelta(days=365)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        
+        events_result = client.execute(client.service.events().list(
+            calendarId=config.CALENDAR_ID,
+            q=query,
+            timeMin=now,
+            timeMax=one_year_future,
+            maxResults=max_results,
+            singleEvents=True,
+            orderBy='startTime',
+            fields=_EVENT_LIST_FIELDS,
+        ))
+        
+        events = events_result.get('items', [])
+        
+        if not events:
+            return f"No events found matching '{query}'."
+        
+        return f"Events matching '{query}':\n\n" + "\n\n".join(client.format_events(events))
 
 @register_tool
-class DeleteEventTool(BaseTool):
+class DeleteEventTool(_EventMutationTool):
     """Tool for deleting a calendar event."""
     
     name = "delete_calendar_event"
     description = "Delete an event from the user's Google Calendar by event ID"
+    action = "deleting event"
     
-    def execute(self, event_id: str) -> str:
+    def prepare(self, event_id: str) -> Tuple[HttpRequest, Callable[[Any], str]]:
         """
-        Delete a calendar event.
+        Build the request deleting a calendar event.
         
         Args:
             event_id: The ID of the event to delete.
             
         Returns:
-            A confirmation message.
+            The request, and a function returning the confirmation message.
         """
-        try:
-            client = CalendarClient()
-            
-            # First get the event to confirm its details
-            event = client.service.events().get(
-                calendarId=config.CALENDAR_ID, 
-                eventId=event_id
-            ).execute()
-            
-            summary = event.get('summary', 'Unknown event')
-            
-            # Delete the event
-            client.service.events().delete(
-                calendarId=config.CALENDAR_ID, 
-                eventId=event_id
-            ).execute()
-            
-            return f"Event '{summary}' (ID: {event_id}) has been deleted."
-        except Exception as e:
-            return f"Error deleting event: {str(e)}"
+        client = get_calendar_client()
+        
+        # Delete the event, the caller already knows its details from listing it
+        request = client.service.events().delete(
+            calendarId=config.CALENDAR_ID, 
+            eventId=event_id
+        )
+        
+        return request, lambda _: f"Event (ID: {event_id}) has been deleted."
 
 @register_tool
-class ModifyEventTool(BaseTool):
+class ModifyEventTool(_EventMutationTool):
     """Tool for modifying a calendar event."""
     
     name = "modify_calendar_event"
     description = "Modify an existing event in the user's Google Calendar"
+    action = "modifying event"
     
-    def execute(
+    def prepare(
         self,
         event_id: str,
         summary: Optional[str] = None,
@@ -283,9 +401,9 @@ class ModifyEventTool(BaseTool):
         description: Optional[str] = None,
         start_time: Optional[str] = None,
         end_time: Optional[str] = None,
-    ) -> str:
+    ) -> Tuple[HttpRequest, Callable[[Any], str]]:
         """
-        Modify a calendar event.
+        Build the request modifying a calendar event.
         
         Args:
             event_id: The ID of the event to modify.
@@ -296,54 +414,44 @@ class ModifyEventTool(BaseTool):
             end_time: New end time in ISO 8601 format (optional).
             
         Returns:
-            A confirmation message with the updated event details.
+            The request, and a function turning the updated event into a confirmation message.
         """
-        try:
-            client = CalendarClient()
-            
-            # Get the existing event
-            event = client.service.events().get(
-                calendarId=config.CALENDAR_ID, 
-                eventId=event_id
-            ).execute()
-            
-            # Update the fields that were provided
-            if summary is not None:
-                event['summary'] = summary
-            if location is not None:
-                event['location'] = location
-            if description is not None:
-                event['description'] = description
-                
-            # Update times if provided
-            tz = pytz.timezone(config.TIMEZONE)
-            
-            if start_time is not None:
-                if not start_time.endswith('Z') and '+' not in start_time:
-                    dt = datetime.strptime(start_time, config.DATE_FORMAT)
-                    start_time = tz.localize(dt).isoformat()
-                event['start']['dateTime'] = start_time
-                
-            if end_time is not None:
-                if not end_time.endswith('Z') and '+' not in end_time:
-                    dt = datetime.strptime(end_time, config.DATE_FORMAT)
-                    end_time = tz.localize(dt).isoformat()
-                event['end']['dateTime'] = end_time
-            
-            # Update the event
-            updated_event = client.service.events().update(
-                calendarId=config.CALENDAR_ID, 
-                eventId=event_id, 
-                body=event
-            ).execute()
-            
+        client = get_calendar_client()
+        
+        # Only send the fields that were provided, the server merges them into the event
+        event = {}
+        if summary is not None:
+            event['summary'] = summary
+        if location is not None:
+            event['location'] = location
+        if description is not None:
+            event['description'] = description
+            
+        # Update times if provided
+        if start_time is not None:
+            start_time = _to_tz_iso(start_time)
+            event['start'] = {'dateTime': start_time}
+            
+        if end_time is not None:
+            end_time = _to_tz_iso(end_time)
+            event['end'] = {'dateTime': end_time}
+        
+        # Update the event
+        request = client.service.events().patch(
+            calendarId=config.CALENDAR_ID, 
+            eventId=event_id, 
+            body=event,
+            fields=_EVENT_FIELDS
+        )
+        
+        def render(updated_event: Dict[str, Any]) -> str:
             return (
                 f"Event updated successfully!\n"
                 f"Updated details:\n"
                 f"{client.format_event(updated_event)}"
             )
-        except Exception as e:
-            return f"Error modifying event: {str(e)}"
+        
+        return request, render
 
 @register_tool
 class GetTodaysEventsTool(BaseTool):
@@ -352,6 +460,7 @@ class GetTodaysEventsTool(BaseTool):
     name = "get_todays_calendar_events"
     description = "Get all events scheduled for today from the user's Google Calendar"
     
+    @_tool_errors("getting today's events")
     def execute(self) -> str:
         """
         Get all events scheduled for today.
@@ -359,30 +468,27 @@ class GetTodaysEventsTool(BaseTool):
         Returns:
             A formatted list of today's events.
         """
-        try:
-            client = CalendarClient()
-            
-            # Get today's date range
-            tz = pytz.timezone(config.TIMEZONE)
-            now = datetime.now(tz)
-            start_of_day = datetime(now.year, now.month, now.day, 0, 0, 0, tzinfo=tz).isoformat()
-            end_of_day = datetime(now.year, now.month, now.day, 23, 59, 59, tzinfo=tz).isoformat()
-            
-            events_result = client.service.events().list(
-                calendarId=config.CALENDAR_ID,
-                timeMin=start_of_day,
-                timeMax=end_of_day,
-                maxResults=config.MAX_CALENDAR_RESULTS,
-                singleEvents=True,
-                orderBy='startTime',
-            ).execute()
-            
-            events = events_result.get('items', [])
-            
-            if not events:
-                return "No events scheduled for today."
-            
-            formatted_events = client.format_events(events)
-            return "Today's events:\n\n" + "\n\n".join(formatted_events)
-        except Exception as e:
-            return f"Error getting today's events: {str(e)}" 
\ No newline at end of file
+        client = get_calendar_client()
+        
+        # Get today's date range
+        # Localize the bounds on their own, their UTC offset can differ from now's on DST change days
+        now = datetime.now(_TZ).replace(tzinfo=None)
+        start_of_day = _TZ.localize(now.replace(hour=0, minute=0, second=0, microsecond=0)).isoformat()
+        end_of_day = _TZ.localize(now.replace(hour=23, minute=59, second=59, microsecond=0)).isoformat()
+        
+        events_result = client.execute(client.service.events().list(
+            calendarId=config.CALENDAR_ID,
+            timeMin=start_of_day,
+            timeMax=end_of_day,
+            maxResults=config.MAX_CALENDAR_RESULTS,
+            singleEvents=True,
+            orderBy='startTime',
+            fields=_EVENT_LIST_FIELDS,
+        ))
+        
+        events = events_result.get('items', [])
+        
+        if not events:
+            return "No events scheduled for today."
+        
+        return "Today's events:\n\n" + "\n\n".join(client.format_events(events)) 
\ No newline at end of file
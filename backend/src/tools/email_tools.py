@@ -1,11 +1,19 @@
 """
 Email-related tools for interacting with Gmail.
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime, timedelta
-import base64
+import binascii
+import functools
+import html
+from io import StringIO
+from email.message import EmailMessage
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest, BatchHttpRequest
 import sys
 import os
 
@@ -14,65 +22,236 @@ if __name__ == "__main__":
     sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.tools.base import BaseTool, register_tool
-from src.google_authenticator import GoogleAuthenticator
+from src.google_authenticator import get_authenticator
 import src.config as config
 
+# Gmail accepts at most 100 requests in a single batch
+_BATCH_SIZE = 100
+
+# Partial response selectors, only the parts of a message that are actually read
+_LIST_FIELDS = 'messages/id,nextPageToken'
+# Partial responses cannot select recursively, so nested multipart parts are spelled out four levels deep
+_PART_FIELDS = 'mimeType,body/data,parts(mimeType,body/data,parts(mimeType,body/data,parts(mimeType,body/data)))'
+_MESSAGE_FIELDS = f'id,payload/headers,payload/mimeType,payload/body/data,payload/parts({_PART_FIELDS})'
+
+# Listings only need these headers and the snippet, bodies are fetched on demand
+_METADATA_HEADERS = ['From', 'Subject', 'Date']
+_METADATA_FIELDS = 'id,snippet,payload/headers'
+
+# Worker threads used for messages the batch requests did not return
+_MAX_FETCH_WORKERS = 10
+
+# Gmail bodies use the URL-safe base64 alphabet, received bodies without padding
+_URLSAFE_TRANS = str.maketrans('-_', '+/')
+_URLSAFE_ENCODE_TRANS = bytes.maketrans(b'+/', b'-_')
+
+def _decode_body(data: Optional[str]) -> str:
+    """Decode a base64url message body, returning '' for empty bodies."""
+    if not data:
+        return ''
+    return binascii.a2b_base64(data.translate(_URLSAFE_TRANS) + '===').decode('utf-8', errors='replace')
+
+def _find_part_data(part: Dict[str, Any], mime_type: str) -> Optional[str]:
+    """Find the body data of the first part with the given MIME type, searching nested parts depth-first."""
+    if part.get('mimeType') == mime_type:
+        data = part.get('body', {}).get('data')
+        if data:
+            return data
+    for sub_part in part.get('parts', []):
+        data = _find_part_data(sub_part, mime_type)
+        if data:
+            return data
+    return None
+
+def _headers_dict(message: Dict[str, Any]) -> Dict[str, str]:
+    """Map the lowercased header names of a message to their values."""
+    return {h['name'].lower(): h['value'] for h in message.get('payload', {}).get('headers', [])}
+
 class EmailClient:
     """Handles interaction with the Gmail API."""
     
-    _instance = None
+    def __init__(self):
+        """Initialize the email client."""
+        self.authenticator = get_authenticator()
+        self._service = None
+        self._service_lock = threading.Lock()
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(EmailClient, cls).__new__(cls)
-            cls._instance._initialize()
-        return cls._instance
+    @property
+    def service(self):
+        """Get the Gmail service, building it on first access."""
+        self.authenticator.ensure_valid()
+        if self._service is None:
+            with self._service_lock:
+                if self._service is None:
+                    # Use the discovery document bundled with the client library, no fetch or cache lookup
+                    self._service = build(
+                        'gmail', 'v1',
+                        credentials=self.authenticator.creds,
+                        static_discovery=True,
+                        cache_discovery=False
+                    )
+        return self._service
     
-    def _initialize(self):
-        """Initialize the email client."""
-        self.authenticator = GoogleAuthenticator()
-        self.service = build('gmail', 'v1', credentials=self.authenticator.creds)
+    def execute(self, request: Union[HttpRequest, BatchHttpRequest]) -> Any:
+        """Execute a request or batch on one of the authenticator's pooled HTTP transports."""
+        return self.authenticator.execute(request)
+    
+    def fetch_and_format(self, list_kwargs: Dict[str, Any], empty_msg: str, fail_msg: str) -> str:
+        """
+        List messages, fetch them and format them for display.
+        
+        Args:
+            list_kwargs: Arguments for messages().list(), besides the user ID.
+            empty_msg: Message returned when no emails are listed.
+            fail_msg: Message returned when none of the listed emails could be processed.
+            
+        Returns:
+            The formatted emails, or one of the given messages.
+        """
+        results = self.execute(self.service.users().messages().list(
+            userId='me',
+            fields=_LIST_FIELDS,
+            **list_kwargs
+        ))
+        
+        messages = results.get('messages', [])
+        
+        if not messages:
+            return empty_msg
+        
+        out = StringIO()
+        
+        for message in self.fetch_messages([m['id'] for m in messages], metadata_only=True):
+            try:
+                email_data = self.message_to_email_data(message)
+            except Exception as e:
+                continue  # Skip this email if there's an error
+            
+            if out.tell():
+                out.write("\n")
+            self.format_email(email_data, out)
+        
+        if not out.tell():
+            return fail_msg
+        
+        return out.getvalue()
+    
+    def fetch_messages(self, message_ids: List[str], metadata_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Fetch messages using batched HTTP requests instead of one request each.
+        
+        Messages the batches did not return (e.g. rate-limited sub-requests or a
+        failed batch) are fetched again individually in parallel. Messages that
+        still fail to load are skipped; the order of message_ids is kept.
+        
+        Args:
+            message_ids: IDs of the messages to fetch.
+            metadata_only: If True, fetch only the listing headers and snippet instead of the body.
+            
+        Returns:
+            The fetched messages.
+        """
+        fetched = {}
+        
+        def collect(request_id, response, exception):
+            if exception is None:
+                fetched[request_id] = response
+        
+        for start in range(0, len(message_ids), _BATCH_SIZE):
+            try:
+                batch = self.service.new_batch_http_request(callback=collect)
+                for message_id in message_ids[start:start + _BATCH_SIZE]:
+                    batch.add(self._message_request(message_id, metadata_only), request_id=message_id)
+                self.execute(batch)
+            except Exception:
+                pass  # Fetched individually below
+        
+        missing = [message_id for message_id in message_ids if message_id not in fetched]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(len(missing), _MAX_FETCH_WORKERS)) as executor:
+                results = executor.map(lambda message_id: self._fetch_message(message_id, metadata_only), missing)
+                for message_id, message in zip(missing, results):
+                    if message is not None:
+                        fetched[message_id] = message
+        
+        return [fetched[message_id] for message_id in message_ids if message_id in fetched]
+    
+    def get_message(self, message_id: str) -> Dict[str, Any]:
+        """Fetch a single full message."""
+        return self.execute(self._message_request(message_id))
+    
+    def _fetch_message(self, message_id: str, metadata_only: bool = False) -> Optional[Dict[str, Any]]:
+        """Fetch a single message, returning None if it fails."""
+        try:
+            return self.execute(self._message_request(message_id, metadata_only))
+        except Exception:
+            return None
     
-    def format_email(self, email_data: Dict[str, Any]) -> str:
-        """Format an email dictionary into a readable string with type indicator."""
+    def _message_request(self, message_id: str, metadata_only: bool = False):
+        """Build the request for a message, either full or limited to the listing metadata."""
+        if metadata_only:
+            return self.service.users().messages().get(
+                userId='me',
+                id=message_id,
+                format='metadata',
+                metadataHeaders=_METADATA_HEADERS,
+                fields=_METADATA_FIELDS
+            )
+        return self.service.users().messages().get(
+            userId='me',
+            id=message_id,
+            format='full',
+            fields=_MESSAGE_FIELDS
+        )
+    
+    def message_to_email_data(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract the sender, subject, date and content (or snippet, for metadata-only messages) of a message."""
+        headers = _headers_dict(message)
+        if 'snippet' in message:
+            content = html.unescape(message['snippet'])
+        else:
+            content = self.extract_email_content(message)
+        return {
+            'id': message['id'],
+            'sender': headers.get('from'),
+            'subject': headers.get('subject'),
+            'content': content,
+            'date': headers.get('date', 'Unknown date')
+        }
+    
+    def format_email(self, email_data: Dict[str, Any], out: StringIO) -> None:
+        """Write an email dictionary into the buffer as a readable string with type indicator."""
         sender = email_data.get('sender', 'Unknown sender')
         subject = email_data.get('subject', 'No subject')
         content = email_data.get('content', 'No content')
         date = email_data.get('date', 'Unknown date')
         email_id = email_data.get('id', 'No ID')
         
-        return (
+        out.write(
             f"[EMAIL]\n"
             f"📧 {sender}\n"
             f"📅 {date}\n"
             f"📌 {subject}\n"
+            f"🆔 {email_id}\n"
             f"{content}\n"
         )
     
     def extract_email_content(self, message: Dict[str, Any]) -> str:
         """
         Extract the content of an email, prioritizing plain text over HTML.
+        
+        Nested multipart parts are searched for plain text first, so HTML is
+        only sanitized when the email has no plain text version at all.
         """
         try:
-            # Check if the email has parts
-            if 'parts' in message['payload']:
-                for part in message['payload']['parts']:
-                    if part['mimeType'] == 'text/plain':  # Prioritize plain text
-                        if 'data' in part['body']:
-                            return base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
-                    elif part['mimeType'] == 'text/html':  # Fallback to HTML
-                        if 'data' in part['body']:
-                            html_content = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
-                            return self._sanitize_html(html_content)
-            else:
-                # Handle case where email has no parts (e.g., single part emails)
-                if message['payload']['mimeType'] == 'text/plain':
-                    if 'data' in message['payload']['body']:
-                        return base64.urlsafe_b64decode(message['payload']['body']['data']).decode('utf-8')
-                elif message['payload']['mimeType'] == 'text/html':
-                    if 'data' in message['payload']['body']:
-                        html_content = base64.urlsafe_b64decode(message['payload']['body']['data']).decode('utf-8')
-                        return self._sanitize_html(html_content)
+            data = _find_part_data(message['payload'], 'text/plain')
+            if data:
+                return _decode_body(data)
+            
+            # Fallback to HTML
+            data = _find_part_data(message['payload'], 'text/html')
+            if data:
+                return self._sanitize_html(_decode_body(data))
         except Exception as e:
             return f"Unable to decode email content: {e}"
         
@@ -80,6 +259,14 @@ class EmailClient:
     
     def _sanitize_html(self, html_content: str) -> str:
         """Convert HTML content to plain text and remove unwanted formatting."""
+        try:
+            tree = LexborHTMLParser(html_content)
+            # Drop style and script bodies, which bs4's get_text skips as well
+            tree.strip_tags(['script', 'style'])
+            return tree.text(separator=' ', strip=True)
+        except Exception:
+            pass  # Fall back to the slower pure-Python parser
+        
         try:
             soup = BeautifulSoup(html_content, 'html.parser')
             return soup.get_text(separator=' ', strip=True)
@@ -88,11 +275,12 @@ class EmailClient:
     
     def get_email_date(self, message: Dict[str, Any]) -> str:
         """Extract the date from email headers."""
-        headers = message.get('payload', {}).get('headers', [])
-        for header in headers:
-            if header['name'].lower() == 'date':
-                return header['value']
-        return "Unknown date"
+        return _headers_dict(message).get('date', "Unknown date")
+
+@functools.cache
+def get_email_client() -> EmailClient:
+    """Get the shared email client."""
+    return EmailClient()
 
 @register_tool
 class FetchLatestEmailsTool(BaseTool):
@@ -112,60 +300,14 @@ class FetchLatestEmailsTool(BaseTool):
             A formatted list of email details.
         """
         try:
-            client = EmailClient()
+            client = get_email_client()
             
             # Fetch the latest emails
-            results = client.service.users().messages().list(
-                userId='me', 
-                maxResults=max_results,
-                labelIds=['INBOX']
-            ).execute()
-            
-            messages = results.get('messages', [])
-            
-            if not messages:
-                return "No emails found in your inbox."
-            
-            email_details = []
-            
-            for message_info in messages:
-                try:
-                    email_id = message_info['id']
-                    message = client.service.users().messages().get(
-                        userId='me', 
-                        id=email_id, 
-                        format='full'
-                    ).execute()
-                    
-                    # Extract email data
-                    email_data = {
-                        'id': email_id,
-                        'sender': None,
-                        'subject': None,
-                        'content': None,
-                        'date': client.get_email_date(message)
-                    }
-                    
-                    # Extract headers
-                    headers = message['payload']['headers']
-                    for header in headers:
-                        if header['name'] == 'From':
-                            email_data['sender'] = header['value']
-                        elif header['name'] == 'Subject':
-                            email_data['subject'] = header['value']
-                    
-                    # Extract content
-                    email_data['content'] = client.extract_email_content(message)
-                    
-                    # Format and add to results
-                    email_details.append(client.format_email(email_data))
-                except Exception as e:
-                    continue  # Skip this email if there's an error
-            
-            if not email_details:
-                return "Could not process any emails."
-            
-            return "\n".join(email_details)
+            return client.fetch_and_format(
+                {'maxResults': max_results, 'labelIds': ['INBOX']},
+                empty_msg="No emails found in your inbox.",
+                fail_msg="Could not process any emails."
+            )
         except Exception as e:
             return f"Error fetching emails: {str(e)}"
 
@@ -192,60 +334,14 @@ class SearchEmailsTool(BaseTool):
             A formatted list of email details matching the query.
         """
         try:
-            client = EmailClient()
+            client = get_email_client()
             
             # Search for emails
-            results = client.service.users().messages().list(
-                userId='me', 
-                maxResults=max_results,
-                q=query
-            ).execute()
-            
-            messages = results.get('messages', [])
-            
-            if not messages:
-                return f"No emails found matching '{query}'."
-            
-            email_details = []
-            
-            for message_info in messages:
-                try:
-                    email_id = message_info['id']
-                    message = client.service.users().messages().get(
-                        userId='me', 
-                        id=email_id, 
-                        format='full'
-                    ).execute()
-                    
-                    # Extract email data
-                    email_data = {
-                        'id': email_id,
-                        'sender': None,
-                        'subject': None,
-                        'content': None,
-                        'date': client.get_email_date(message)
-                    }
-                    
-                    # Extract headers
-                    headers = message['payload']['headers']
-                    for header in headers:
-                        if header['name'] == 'From':
-                            email_data['sender'] = header['value']
-                        elif header['name'] == 'Subject':
-                            email_data['subject'] = header['value']
-                    
-                    # Extract content
-                    email_data['content'] = client.extract_email_content(message)
-                    
-                    # Format and add to results
-                    email_details.append(client.format_email(email_data))
-                except Exception as e:
-                    continue  # Skip this email if there's an error
-            
-            if not email_details:
-                return f"Could not process any emails matching '{query}'."
-            
-            return "\n".join(email_details)
+            return client.fetch_and_format(
+                {'maxResults': max_results, 'q': query},
+                empty_msg=f"No emails found matching '{query}'.",
+                fail_msg=f"Could not process any emails matching '{query}'."
+            )
         except Exception as e:
             return f"Error searching emails: {str(e)}"
 
@@ -274,7 +370,7 @@ class FetchEmailsByDateTool(BaseTool):
             A formatted list of email details within the date range.
         """
         try:
-            client = EmailClient()
+            client = get_email_client()
             
             # Construct the date query
             query = f"after:{start_date}"
@@ -282,61 +378,42 @@ class FetchEmailsByDateTool(BaseTool):
                 query += f" before:{end_date}"
             
             # Search for emails
-            results = client.service.users().messages().list(
-                userId='me', 
-                maxResults=max_results,
-                q=query
-            ).execute()
-            
-            messages = results.get('messages', [])
-            
-            if not messages:
-                date_range = f"from {start_date}" + (f" to {end_date}" if end_date else "")
-                return f"No emails found {date_range}."
-            
-            email_details = []
+            date_range = f"from {start_date}" + (f" to {end_date}" if end_date else "")
+            return client.fetch_and_format(
+                {'maxResults': max_results, 'q': query},
+                empty_msg=f"No emails found {date_range}.",
+                fail_msg=f"No emails found {date_range}."
+            )
+        except Exception as e:
+            return f"Error fetching emails by date: {str(e)}"
+
+@register_tool
+class GetEmailBodyTool(BaseTool):
+    """Tool for reading the full content of an email."""
+    
+    name = "get_email_body"
+    description = "Get the full content of an email by its ID, as listed by the other email tools"
+    
+    def execute(self, email_id: str) -> str:
+        """
+        Fetch the full content of an email.
+        
+        Args:
+            email_id: The ID of the email.
             
-            for message_info in messages:
-                try:
-                    email_id = message_info['id']
-                    message = client.service.users().messages().get(
-                        userId='me', 
-                        id=email_id, 
-                        format='full'
-                    ).execute()
-                    
-                    # Extract email data
-                    email_data = {
-                        'id': email_id,
-                        'sender': None,
-                        'subject': None,
-                        'content': None,
-                        'date': client.get_email_date(message)
-                    }
-                    
-                    # Extract headers
-                    headers = message['payload']['headers']
-                    for header in headers:
-                        if header['name'] == 'From':
-                            email_data['sender'] = header['value']
-                        elif header['name'] == 'Subject':
-                            email_data['subject'] = header['value']
-                    
-                    # Extract content
-                    email_data['content'] = client.extract_email_content(message)
-                    
-                    # Format and add to results
-                    email_details.append(client.format_email(email_data))
-                except Exception as e:
-                    continue  # Skip this email if there's an error
+        Returns:
+            The formatted email with its full content.
+        """
+        try:
+            client = get_email_client()
             
-            if not email_details:
-                date_range = f"from {start_date}" + (f" to {end_date}" if end_date else "")
-                return f"No emails found {date_range}."
+            message = client.get_message(email_id)
             
-            return "\n".join(email_details)
+            out = StringIO()
+            client.format_email(client.message_to_email_data(message), out)
+            return out.getvalue()
         except Exception as e:
-            return f"Error fetching emails by date: {str(e)}"
+            return f"Error fetching email: {str(e)}"
 
 @register_tool
 class SendEmailTool(BaseTool):
@@ -367,7 +444,7 @@ class SendEmailTool(BaseTool):
             A confirmation message indicating whether the email was sent successfully.
         """
         try:
-            client = EmailClient()
+            client = get_email_client()
             
             # Create the email message
             message = {
@@ -375,10 +452,10 @@ class SendEmailTool(BaseTool):
             }
             
             # Send the email
-            sent_message = client.service.users().messages().send(
+            sent_message = client.execute(client.service.users().messages().send(
                 userId='me',
                 body=message
-            ).execute()
+            ))
             
             return f"Email sent successfully! Message ID: {sent_message['id']}"
         except Exception as e:
@@ -386,19 +463,14 @@ class SendEmailTool(BaseTool):
     
     def _create_message(self, to: str, subject: str, body: str, cc: Optional[str] = None, bcc: Optional[str] = None) -> str:
         """Create a properly formatted email message."""
-        # Create the email headers
-        headers = [
-            f"To: {to}",
-            f"Subject: {subject}"
-        ]
-        
+        message = EmailMessage()
+        message['To'] = to
+        message['Subject'] = subject
         if cc:
-            headers.append(f"Cc: {cc}")
+            message['Cc'] = cc
         if bcc:
-            headers.append(f"Bcc: {bcc}")
-        
-        # Combine headers and body
-        message = "\r\n".join(headers) + "\r\n\r\n" + body
+            message['Bcc'] = bcc
+        message.set_content(body)
         
         # Encode the message in base64url format
-        return base64.urlsafe_b64encode(message.encode('utf-8')).decode('utf-8') 
\ No newline at end of file
+        return binascii.b2a_base64(bytes(message), newline=False).translate(_URLSAFE_ENCODE_TRANS).decode('ascii')
\ No newline at end of file
@@ -1,8 +1,9 @@
 """
 Utility tools for the assistant.
 """
-from typing import Optional
-from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from datetime import date, datetime, timedelta
+import functools
 import pytz
 import re
 import sys
@@ -15,6 +16,92 @@ if __name__ == "__main__":
 from src.tools.base import BaseTool, register_tool
 import src.config as config
 
+# Resolved once, the timezone setting does not change at runtime
+_TZ = pytz.timezone(config.TIMEZONE)
+
+# Relative date expressions understood by ParseDateTool, scanned in a single pass
+_DATE_PATTERN = re.compile(
+    r'\b(?P<today>today|now)\b'
+    r'|\b(?P<tomorrow>tomorrow)\b'
+    r'|\b(?P<yesterday>yesterday)\b'
+    r'|\b(?P<next_week>next\s+week)\b'
+    r'|\b(?P<next_month>next\s+month)\b'
+    r'|\bnext\s+(?P<next_day>\w+day)\b',
+    re.IGNORECASE
+)
+
+_DAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+# Locale-independent names, indexed by weekday() and month - 1
+_WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+_MONTHS = [
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+]
+
+def _parse_ymd(date_str: str) -> datetime:
+    """Parse a YYYY-MM-DD date without the overhead of strptime, accepting unpadded months and days like it."""
+    parts = date_str.split('-')
+    if (len(parts) != 3 or len(parts[0]) != 4 or not 1 <= len(parts[1]) <= 2
+            or not 1 <= len(parts[2]) <= 2 or not all(part.isdigit() for part in parts)):
+        raise ValueError(f"time data '{date_str}' does not match format 'YYYY-MM-DD'")
+    return datetime(int(parts[0]), int(parts[1]), int(parts[2]))
+
+@functools.lru_cache(maxsize=512)
+def _parse(date_text_lower: str, gmail_format: bool, today_ordinal: int) -> Optional[Tuple[str, str]]:
+    """
+    Resolve a relative date expression against a given day.
+    
+    Taking the day as an ordinal keeps results cached for the current day only.
+    
+    Args:
+        date_text_lower: The lowercased natural language date description.
+        gmail_format: If True, format the date as YYYY/MM/DD instead of YYYY-MM-DD.
+        today_ordinal: Proleptic Gregorian ordinal of the current date.
+        
+    Returns:
+        The formatted date and its day name, or None if the text was not understood.
+    """
+    today = date.fromordinal(today_ordinal)
+    result_date = None
+    
+    match = _DATE_PATTERN.search(date_text_lower)
+    kind = match.lastgroup if match else None
+    
+    if kind == 'today':
+        result_date = today
+    elif kind == 'tomorrow':
+        result_date = today + timedelta(days=1)
+    elif kind == 'yesterday':
+        result_date = today - timedelta(days=1)
+    elif kind == 'next_week':
+        result_date = today + timedelta(weeks=1)
+    elif kind == 'next_month':
+        # Approximate next month
+        result_date = today + timedelta(days=30)
+    elif kind == 'next_day':
+        day_name = match.group('next_day')
+        if day_name in _DAYS:
+            target_day = _DAYS[day_name]
+            days_ahead = (target_day - today.weekday()) % 7
+            if days_ahead == 0:  # It's the same day, so get next week
+                days_ahead = 7
+            result_date = today + timedelta(days=days_ahead)
+    
+    if result_date is None:
+        return None
+    
+    # Format based on requirement
+    if gmail_format:
+        formatted_date = result_date.strftime('%Y/%m/%d')
+    else:
+        formatted_date = result_date.isoformat()
+    
+    return formatted_date, _WEEKDAYS[result_date.weekday()]
+
 @register_tool
 class GetCurrentTimeTool(BaseTool):
     """Tool for getting the current time."""
@@ -33,8 +120,7 @@ class GetCurrentTimeTool(BaseTool):
             The current time and date as a formatted string.
         """
         try:
-            tz = pytz.timezone(config.TIMEZONE)
-            now = datetime.now(tz)
+            now = datetime.now(_TZ)
             
             if format:
                 return now.strftime(format)
@@ -61,20 +147,22 @@ class GetDateInfoTool(BaseTool):
             Information about the specified date.
         """
         try:
-            tz = pytz.timezone(config.TIMEZONE)
-            
             if date:
-                dt = datetime.strptime(date, "%Y-%m-%d")
-                dt = tz.localize(dt)
+                dt = _parse_ymd(date)
+                dt = _TZ.localize(dt)
             else:
-                dt = datetime.now(tz)
+                dt = datetime.now(_TZ)
+            
+            day_of_year = dt.timetuple().tm_yday
+            # Weeks start on Sunday, days before the first Sunday are in week 0 (like %U)
+            week_number = (day_of_year + 6 - (dt.weekday() + 1) % 7) // 7
             
             return (
-                f"Date: {dt.strftime('%Y-%m-%d')}\n"
-                f"Day of week: {dt.strftime('%A')}\n"
-                f"Week number: {dt.strftime('%U')}\n"
-                f"Month: {dt.strftime('%B')}\n"
-                f"Day of year: {dt.strftime('%j')}\n"
+                f"Date: {dt.date().isoformat()}\n"
+                f"Day of week: {_WEEKDAYS[dt.weekday()]}\n"
+                f"Week number: {week_number:02d}\n"
+                f"Month: {_MONTHS[dt.month - 1]}\n"
+                f"Day of year: {day_of_year:03d}\n"
                 f"Timezone: {dt.tzname()}"
             )
         except Exception as e:
@@ -99,9 +187,8 @@ class CalculateDateDifferenceTool(BaseTool):
             The difference between the dates in days, weeks, and months.
         """
         try:
-            date_format = "%Y-%m-%d"
-            start = datetime.strptime(start_date, date_format)
-            end = datetime.strptime(end_date, date_format)
+            start = _parse_ymd(start_date)
+            end = _parse_ymd(end_date)
             
             # Calculate the difference
             diff = end - start
@@ -147,16 +234,12 @@ class GenerateDateRangeTool(BaseTool):
             A list of dates in the specified range.
         """
         try:
-            date_format = "%Y-%m-%d"
-            start = datetime.strptime(start_date, date_format)
-            end = datetime.strptime(end_date, date_format)
+            start = _parse_ymd(start_date)
+            end = _parse_ymd(end_date)
             
             if start > end:
                 return "Error: Start date must be before end date."
             
-            dates = []
-            current = start
-            
             # Set the delta based on the interval
             if interval.lower() == "day":
                 delta = timedelta(days=1)
@@ -169,21 +252,19 @@ class GenerateDateRangeTool(BaseTool):
                 return f"Error: Invalid interval '{interval}'. Use 'day', 'week', or 'month'."
             
             # Generate dates
-            count = 0
-            while current <= end and count < max_dates:
-                dates.append(current.strftime(date_format))
-                current += delta
-                count += 1
+            available = (end - start) // delta + 1
+            limited = available > max_dates
+            dates = [(start + i * delta).date().isoformat() for i in range(min(available, max_dates))]
             
             total_dates = len(dates)
-            if current <= end:
+            if limited:
                 dates.append("...")
             
             return (
                 f"Date range from {start_date} to {end_date} by {interval}:\n"
                 f"{', '.join(dates)}\n"
                 f"Generated {total_dates} dates" + 
-                (f" (limited to {max_dates})" if current <= end else "")
+                (f" (limited to {max_dates})" if limited else "")
             )
         except Exception as e:
             return f"Error generating date range: {str(e)}"
@@ -207,51 +288,10 @@ class ParseDateTool(BaseTool):
             The parsed date in YYYY-MM-DD format (or YYYY/MM/DD if gmail_format=True).
         """
         try:
-            tz = pytz.timezone(config.TIMEZONE)
-            now = datetime.now(tz)
-            result_date = None
-            
-            # Common date patterns
-            today_pattern = re.compile(r'\b(?:today|now)\b', re.IGNORECASE)
-            tomorrow_pattern = re.compile(r'\btomorrow\b', re.IGNORECASE)
-            yesterday_pattern = re.compile(r'\byesterday\b', re.IGNORECASE)
-            next_week_pattern = re.compile(r'\bnext\s+week\b', re.IGNORECASE)
-            next_month_pattern = re.compile(r'\bnext\s+month\b', re.IGNORECASE)
-            next_day_pattern = re.compile(r'\bnext\s+(\w+day)\b', re.IGNORECASE)
-            
-            # Check patterns
-            if today_pattern.search(date_text):
-                result_date = now
-            elif tomorrow_pattern.search(date_text):
-                result_date = now + timedelta(days=1)
-            elif yesterday_pattern.search(date_text):
-                result_date = now - timedelta(days=1)
-            elif next_week_pattern.search(date_text):
-                result_date = now + timedelta(weeks=1)
-            elif next_month_pattern.search(date_text):
-                # Approximate next month
-                result_date = now + timedelta(days=30)
-            elif next_day_match := next_day_pattern.search(date_text):
-                day_name = next_day_match.group(1).lower()
-                days = {
-                    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-                    'friday': 4, 'saturday': 5, 'sunday': 6
-                }
-                if day_name in days:
-                    target_day = days[day_name]
-                    days_ahead = (target_day - now.weekday()) % 7
-                    if days_ahead == 0:  # It's the same day, so get next week
-                        days_ahead = 7
-                    result_date = now + timedelta(days=days_ahead)
+            parsed = _parse(date_text.lower(), gmail_format, datetime.now(_TZ).toordinal())
             
-            if result_date:
-                # Format based on requirement
-                if gmail_format:
-                    formatted_date = result_date.strftime('%Y/%m/%d')
-                else:
-                    formatted_date = result_date.strftime('%Y-%m-%d')
-                
-                day_name = result_date.strftime('%A')
+            if parsed:
+                formatted_date, day_name = parsed
                 
                 response = f"'{date_text}' is {formatted_date} ({day_name})"
                 if gmail_format:
@@ -277,8 +317,7 @@ class GetYesterdayDateTool(BaseTool):
             Yesterday's date in YYYY/MM/DD format for Gmail API.
         """
         try:
-            tz = pytz.timezone(config.TIMEZONE)
-            now = datetime.now(tz)
+            now = datetime.now(_TZ)
             yesterday = now - timedelta(days=1)
             
             # Gmail API uses YYYY/MM/DD format
@@ -35,8 +35,21 @@ export const api = {
         if (line.startsWith('data: ')) {
           try {
             const parsedData = JSON.parse(line.slice(6));
+            // Render the structured events as text, like the terminal does
+            let text = '';
             if (parsedData.type === 'content') {
-              result += parsedData.content;
+              text = parsedData.content;
+            } else if (parsedData.type === 'tool_start') {
+              text = `\n[TOOL] Running ${parsedData.name}...\n`;
+            } else if (parsedData.type === 'tool_result') {
+              text = `  ${parsedData.result.replace(/\n/g, '\n  ')}\n`;
+            } else if (parsedData.type === 'tool_error') {
+              text = `\n[ERROR] ${parsedData.error}\n`;
+            } else if (parsedData.type === 'second_response_start') {
+              text = '\n[ASSISTANT] ';
+            }
+            if (text) {
+              result += text;
               if (onStream) {
                 onStream(result);
               }